@@ -0,0 +1,176 @@
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def setup_axes(ax, reach):
+    """
+    Setter opp aksene til animasjonen slik create_animation gjør: lik skala,
+    ingen akser og området -reach til reach i begge retninger. Returnerer
+    de tomme linjene (spor, pendler) som oppdateres for hvert bilde.
+    """
+    ax.axis('equal')
+    ax.axis('off')
+    ax.axis((-reach, reach, -reach, reach))
+    trace, = ax.plot([], [], '-', lw=1, alpha=0.5)
+    pendulums, = ax.plot([], [], 'o-', lw=2)
+    return trace, pendulums
+
+
+def render_frames(frames, start, stop, trail=0, reach=None, figsize=None,
+                  dpi=None):
+    """
+    Tegner bildene start, ..., stop - 1 fra en bildebuffer (bilder,
+    punkter, 2) fra frame_coordinates, uten skjerm (Agg), og returnerer dem
+    som en uint8 array med form (bilder, høyde, bredde, 4) i RGBA. trail
+    gir antall bilder bakover i tid som den siste massen etterlater seg et
+    spor, som i create_animation. Bare frames[start - trail:stop] brukes,
+    så det holder å sende den delen til en arbeidsprosess (og da sette
+    start lik trail, eller mindre om bufferen starter på bilde 0).
+
+    Med reach fra modellen (animation_reach) og standard figsize og dpi
+    blir bildene like dem fra create_animation. Uten reach brukes
+    1.1 ganger den største koordinaten.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if reach is None:
+        reach = 1.1 * np.abs(frames).max()
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    trace, pendulums = setup_axes(fig.add_subplot(), reach)
+
+    width, height = canvas.get_width_height()
+    images = np.empty((stop - start, height, width, 4), dtype=np.uint8)
+    for i in range(start, stop):
+        pendulums.set_data(frames[i, :, 0], frames[i, :, 1])
+        if trail:
+            history = frames[max(i - trail, 0):i + 1, -1]
+            trace.set_data(history[:, 0], history[:, 1])
+        canvas.draw()
+        images[i - start] = np.asarray(canvas.buffer_rgba())
+    return images
+
+
+def _render_segment(task):
+    """Tegner ett segment av bildene i en arbeidsprosess."""
+    frames, start, stop, trail, reach, figsize, dpi = task
+    return render_frames(frames, start, stop, trail, reach, figsize, dpi)
+
+
+def _segments(frames, segment, trail, reach, figsize, dpi):
+    """
+    Deler bildebufferen i segmenter med segment bilder hver. Hvert segment
+    får med seg de trail bildene før, slik at sporet blir det samme som
+    når alt tegnes i én prosess.
+    """
+    for start in range(0, len(frames), segment):
+        stop = min(start + segment, len(frames))
+        first = max(start - trail, 0)
+        yield (frames[first:stop], start - first, stop - first, trail, reach,
+               figsize, dpi)
+
+
+def iter_rendered(frames, trail=0, processes=None, segment=30, reach=None,
+                  figsize=None, dpi=None):
+    """
+    Gir de tegnede bildene segment for segment, i riktig rekkefølge.
+    Segmentene fordeles på processes prosesser (standard er antall kjerner,
+    1 tegner alt i denne prosessen). Høyst to segmenter per prosess er
+    underveis samtidig, så minnebruken er begrenset uansett hvor mange
+    bilder det er.
+    """
+    if reach is None:
+        reach = 1.1 * np.abs(frames).max()
+    tasks = _segments(frames, segment, trail, reach, figsize, dpi)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        for task in tasks:
+            yield _render_segment(task)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_render_segment, task))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def export_animation(model, filename, fps=60, trail=0, processes=None,
+                     segment=30, figsize=None, dpi=None):
+    """
+    Lagrer animasjonen av en løst modell (DoublePendulum eller NPendulum)
+    ved å tegne bildene parallelt i flere prosesser. Inneholder filename et
+    %-mønster, for eksempel "frames/frame_%05d.png", lagres bildene som en
+    PNG-sekvens, og ellers sendes de rått til ffmpeg som lager videoen.
+    Resultatet er det samme uansett antall prosesser, og med standard
+    figsize og dpi er bildene de samme som fra create_animation.
+    """
+    frames = model.frame_coordinates(fps)
+    rendered = iter_rendered(frames, trail, processes, segment,
+                             model.animation_reach, figsize, dpi)
+    if "%" in filename:
+        _write_png_sequence(rendered, filename)
+    else:
+        _write_video(rendered, filename, fps)
+
+
+class AnimationExportMixin:
+    """
+    Gir modellene med frame_coordinates og animation_reach (DoublePendulum
+    og NPendulum) metoden export_animation.
+    """
+    def export_animation(self, filename, fps=60, trail=0, processes=None):
+        """
+        Lagrer animasjonen uten å gå gjennom FuncAnimation, ved å tegne
+        bildene parallelt i processes prosesser (se export_animation). Et
+        %-mønster i filename gir en PNG-sekvens, ellers lages en video med
+        ffmpeg.
+        """
+        export_animation(self, filename, fps, trail, processes)
+
+
+def _write_png_sequence(rendered, pattern):
+    """Skriver bildene til filene pattern % 0, pattern % 1, ..."""
+    import matplotlib.image
+
+    index = 0
+    for images in rendered:
+        for image in images:
+            matplotlib.image.imsave(pattern % index, image)
+            index += 1
+
+
+def _write_video(rendered, filename, fps):
+    """Sender de rå RGBA-bildene gjennom en pipe til ffmpeg."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found. Use a %-pattern in the "
+                           "filename to save a PNG sequence instead.")
+    process = None
+    try:
+        for images in rendered:
+            if process is None:
+                height, width = images.shape[1:3]
+                process = subprocess.Popen(
+                    [ffmpeg, "-y", "-loglevel", "error",
+                     "-f", "rawvideo", "-pix_fmt", "rgba",
+                     "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                     "-pix_fmt", "yuv420p", filename],
+                    stdin=subprocess.PIPE,
+                )
+            process.stdin.write(images.tobytes())
+    finally:
+        if process is not None:
+            process.stdin.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed writing {filename}")
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+from animation_export import iter_rendered
+from double_pendulum import DoublePendulum
+from exp_decay import ExponentialDecay
+from n_pendulum import NPendulum
+from pendulum import Pendulum, DampenedPendulum
+
+Y0 = {
+    "Pendulum": (3 * np.pi / 7, 0),
+    "DampenedPendulum": (3 * np.pi / 7, 0),
+    "DoublePendulum": (3 * np.pi / 7, 1, 3 * np.pi / 4, 1),
+}
+
+
+def _models():
+    """Modellene som måles, med navn."""
+    return {
+        "Pendulum": Pendulum(),
+        "DampenedPendulum": DampenedPendulum(0.25),
+        "DoublePendulum": DoublePendulum(),
+    }
+
+
+def _best_time(func, repeat=5, number=1):
+    """Korteste kjøretid per kall av func over repeat forsøk."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def bench_rhs(quick=False):
+    """Tid for ett kall på høyresiden (__call__) for hver modell."""
+    number = 1000 if quick else 20000
+    results = {}
+    for name, model in _models().items():
+        y = Y0[name]
+        results[f"rhs/{name}"] = {
+            "time": _best_time(lambda: model(0, y), number=number)
+        }
+    decay = ExponentialDecay(0.4)
+    results["rhs/ExponentialDecay"] = {
+        "time": _best_time(lambda: decay(0, 3.2), number=number)
+    }
+    return results
+
+
+def bench_solve(quick=False):
+    """Kjøretid og nfev for solve med ulike metoder og T/dt."""
+    cases = [
+        ("Pendulum", "RK45", {}), ("Pendulum", "RK45", {"dense": True}),
+        ("Pendulum", "Radau", {"dense": True}), ("Pendulum", "verlet", {}),
+        ("DampenedPendulum", "RK45", {}),
+        ("DoublePendulum", "LSODA", {}),
+        ("DoublePendulum", "LSODA", {"dense": True}),
+        ("DoublePendulum", "midpoint", {}),
+    ]
+    grids = [(10, 0.01)] if quick else [(10, 0.01), (60, 0.001)]
+    results = {}
+    for T, dt in grids:
+        for name, method, kwargs in cases:
+            model = _models()[name]
+            mode = "dense" if kwargs.get("dense") else "fixed"
+            key = f"solve/{name}/{method}/{mode}/T={T}/dt={dt}"
+            results[key] = {
+                "time": _best_time(
+                    lambda: model.solve(list(Y0[name]), T, dt, method=method,
+                                        **kwargs),
+                    repeat=1 if quick else 3,
+                ),
+                "nfev": int(model.nfev),
+            }
+    return results
+
+
+def bench_energy(quick=False):
+    """Tid for kinetic + potential på lange løsninger."""
+    n = 100000 if quick else 1000000
+    results = {}
+    for name, model in _models().items():
+        y = np.random.default_rng(1).normal(size=(len(Y0[name]), n))
+        t = np.linspace(0, 100, n)
+
+        def energy():
+            model._set_solution(t, y)
+            return model.kinetic + model.potential
+
+        results[f"energy/{name}/n={n}"] = {
+            "time": _best_time(energy, repeat=3)
+        }
+    return results
+
+
+def bench_frames(quick=False):
+    """Tid for å lage og oppdatere alle bildene i animasjonen."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    T = 10 if quick else 60
+    model = DoublePendulum()
+    model.solve(list(Y0["DoublePendulum"]), T, 0.001, dense=True)
+
+    def frames():
+        model.create_animation(fps=60)
+        for i in range(len(model._frames)):
+            model._next_frame(i)
+        plt.close("all")
+
+    n_frames = len(model.frame_coordinates(60))
+    time = _best_time(frames, repeat=3)
+    return {f"frames/DoublePendulum/T={T}": {
+        "time": time, "frames_per_second": n_frames / time,
+    }}
+
+
+def bench_chain(quick=False):
+    """
+    Hvordan høyresiden og solve for NPendulum skalerer med antall pendler
+    N.
+    """
+    sizes = (2, 5, 20) if quick else (2, 5, 20, 50, 200)
+    number = 200 if quick else 2000
+    results = {}
+    for N in sizes:
+        model = NPendulum(N)
+        y0 = np.concatenate((np.full(N, 0.5), np.zeros(N)))
+        rhs = _best_time(lambda: model(0, y0), number=number)
+        results[f"rhs/NPendulum/N={N}"] = {
+            "time": rhs, "time_per_link": rhs / N,
+        }
+        results[f"solve/NPendulum/RK45/N={N}/T=1/dt=0.01"] = {
+            "time": _best_time(
+                lambda: model.solve(y0, 1, 0.01, method="RK45"),
+                repeat=1 if quick else 3,
+            ),
+            "nfev": int(model.nfev),
+        }
+    return results
+
+
+def bench_export(quick=False):
+    """
+    Tid for å tegne alle bildene i animasjonen uten skjerm, med én prosess
+    og med én prosess per kjerne.
+    """
+    T = 2 if quick else 10
+    model = DoublePendulum()
+    model.solve(list(Y0["DoublePendulum"]), T, 0.001, dense=True)
+    frames = model.frame_coordinates(60)
+    results = {}
+    for processes in sorted({1, os.cpu_count() or 1}):
+        time = _best_time(
+            lambda: [None for _ in iter_rendered(frames, 20, processes)],
+            repeat=1,
+        )
+        results[f"export/DoublePendulum/T={T}/processes={processes}"] = {
+            "time": time, "frames_per_second": len(frames) / time,
+        }
+    return results
+
+
+BENCHMARKS = [bench_rhs, bench_solve, bench_energy, bench_frames,
+              bench_chain, bench_export]
+
+
+def run(quick=False):
+    """Kjører alle målingene og returnerer resultatene som en dict."""
+    results = {}
+    for bench in BENCHMARKS:
+        results.update(bench(quick))
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Sammenligner results med baseline og returnerer en liste med
+    (navn, baseline-tid, ny tid) for alle målinger som er mer enn threshold
+    (relativt) tregere enn baseline. Målinger som bare finnes i den ene
+    hoppes over.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["time"], result["time"]
+        if new > old * (1 + threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Måler hastigheten på løsere, høyresider, energier og "
+                    "animasjon."
+    )
+    parser.add_argument("--save", help="lagre resultatene som JSON-baseline")
+    parser.add_argument("--compare", help="sammenlign med en JSON-baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="tillatt relativ økning i tid (standard 0.2)")
+    parser.add_argument("--quick", action="store_true",
+                        help="kortere målinger")
+    args = parser.parse_args(argv)
+
+    results = run(args.quick)
+    for name, result in results.items():
+        extra = ", ".join(f"{k}={v:.4g}" for k, v in result.items()
+                          if k != "time")
+        print(f"{name:<55}{result['time']:>12.3e} s  {extra}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.3e} s -> {new:.3e} s "
+                  f"({new / old - 1:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+from scipy.integrate import solve_ivp
+from pendulum import Pendulum, DampenedPendulum
+from double_pendulum import DoublePendulum
+
+
+def _first_angle(model):
+    """Henter theta fra Pendulum eller theta1 fra DoublePendulum."""
+    return model.theta if hasattr(model, "theta") else model.theta1
+
+
+def compare_solve_modes(model, y0, T, dt, rtol=None, atol=None):
+    """
+    Løser samme problem med max_step=dt og med dense=True, og returnerer
+    antall kall på høyresiden (nfev), kjøretid og største feil i første
+    vinkel (mot en referanseløsning med rtol=1e-12) for begge modusene.
+    """
+    reference = solve_ivp(model, (0, T), list(y0), method="DOP853",
+                          rtol=1e-12, atol=1e-12, dense_output=True).sol
+    results = {}
+    for name, dense in (("max_step", False), ("dense", True)):
+        start = time.perf_counter()
+        model.solve(list(y0), T, dt, dense=dense, rtol=rtol, atol=atol)
+        results[name] = {
+            "nfev": model.nfev,
+            "runtime": time.perf_counter() - start,
+            "samples": len(model.t),
+            "error": np.max(np.abs(_first_angle(model)
+                                   - reference(model.t)[0])),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    """Skriver ut en tabell med nfev og kjøretid for hver modell."""
+    cases = [
+        ("Pendulum", Pendulum(), (3 * np.pi / 7, 0)),
+        ("DampenedPendulum", DampenedPendulum(0.25), (3 * np.pi / 7, 0)),
+        ("DoublePendulum", DoublePendulum(),
+         (3 * np.pi / 7, 1, 3 * np.pi / 4, 1)),
+    ]
+    T, dt = 10, 0.01
+    print(f"{'model':<18}{'mode':<10}{'nfev':>10}{'runtime [s]':>14}"
+          f"{'max error':>12}")
+    for name, model, y0 in cases:
+        for mode, res in compare_solve_modes(model, y0, T, dt).items():
+            print(f"{name:<18}{mode:<10}{res['nfev']:>10}"
+                  f"{res['runtime']:>14.4f}{res['error']:>12.2e}")
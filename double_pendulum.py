@@ -1,7 +1,19 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
 import numpy as np
+from animation_export import AnimationExportMixin, setup_axes
+from plotting import PlotMixin
 from scipy.integrate import solve_ivp
-import matplotlib.pyplot as plt
-from matplotlib import animation
+from solver_tools import (
+    RhsTimer, clear_cached_properties, clear_events, collect_stats,
+    extend_solution, ivp_options, iter_fixed_step, iter_grid,
+    memory_footprint, record_stats, set_solution, solve_info, storage_policy,
+    time_grid,
+)
 
 class ODEsNotSolve(AssertionError):
     """
@@ -10,11 +22,101 @@ class ODEsNotSolve(AssertionError):
     kaller på solve-metoden."""
     pass
 
+
+class DoublePendulumEnsemble:
+    """
+    Resultatet av DoublePendulum.solve_ensemble. Holder tidsgridet t og en
+    array y med form (N, 4, steg), der radene er theta1, omega1, theta2 og
+    omega2 for hver av de N banene.
+    """
+    def __init__(self, t, y, L1=1, L2=1):
+        self.t = t
+        self.y = y
+        self.L1 = L1
+        self.L2 = L2
+
+    def __len__(self):
+        return self.y.shape[0]
+
+    @property
+    def theta1(self):
+        """theta1 for alle banene, med form (N, steg)."""
+        return self.y[:, 0]
+
+    @property
+    def omega1(self):
+        """omega1 for alle banene, med form (N, steg)."""
+        return self.y[:, 1]
+
+    @property
+    def theta2(self):
+        """theta2 for alle banene, med form (N, steg)."""
+        return self.y[:, 2]
+
+    @property
+    def omega2(self):
+        """omega2 for alle banene, med form (N, steg)."""
+        return self.y[:, 3]
+
+    @property
+    def x1(self):
+        """Horisontal posisjon til den første pendelen, form (N, steg)."""
+        return self.L1 * np.sin(self.theta1)
+
+    @property
+    def y1(self):
+        """Vertikal posisjon til den første pendelen, form (N, steg)."""
+        return -self.L1 * np.cos(self.theta1)
+
+    @property
+    def x2(self):
+        """Horisontal posisjon til den andre pendelen, form (N, steg)."""
+        return self.x1 + self.L2 * np.sin(self.theta2)
+
+    @property
+    def y2(self):
+        """Vertikal posisjon til den andre pendelen, form (N, steg)."""
+        return self.y1 - self.L2 * np.cos(self.theta2)
+
+
+def _theta1_section(t, y):
+    """
+    Hendelse for Poincaré-snittet. sin(theta1) øker gjennom null både når
+    theta1 krysser null med omega1 > 0 og når den krysser pi med
+    omega1 < 0, så de siste sorteres bort etterpå.
+    """
+    return np.sin(y[0])
+
+
+_theta1_section.direction = 1
+
+
+def _poincare_points(task):
+    """Integrerer én bane og returnerer punktene i Poincaré-snittet."""
+    model, y0, T, method, rtol, atol = task
+    # t_eval med bare sluttpunktet gjør at banen ikke lagres underveis
+    sol = solve_ivp(model, (0, T), y0, method=method, t_eval=[T],
+                    events=_theta1_section, rtol=rtol, atol=atol)
+    points = sol.y_events[0]
+    points = points[np.cos(points[:, 0]) > 0]
+    theta2 = (points[:, 2] + np.pi) % (2 * np.pi) - np.pi
+    return np.column_stack((theta2, points[:, 3]))
+
+
 # Oppgave 3a)
-class DoublePendulum:
+class DoublePendulum(PlotMixin, AnimationExportMixin):
     """
     En klasse som tar inn to pendulumer, der den andre pendulumen er festet 
     i den første pendulumen."""
+    # Navnene på kolonnene i en lagret løsning
+    _columns = ("t", "theta1", "omega1", "theta2", "omega2")
+    # Radene i tilstanden som er vinkler (og beholdes med keep_omega=False)
+    _angle_rows = (0, 2)
+    # Kalles med solve_stats etter hvert kall på solve om den er satt
+    stats_hook = None
+    # Animasjonen viser området -3 til 3 i begge retninger
+    animation_reach = 3
+
     def __init__(self, L1=1, L2=1, g=9.81):
         """
         Tar inn parameterne L1, L2, g. Om noe annet ikke er gitt så er 
@@ -54,23 +156,435 @@ class DoublePendulum:
 
         return dtheta1, domega1, dtheta2, domega2
 
+    def jacobian(self, t, y):
+        """
+        Returnerer den analytiske jakobimatrisen til høyresiden, altså de
+        partiellderiverte av (theta1', omega1', theta2', omega2') med hensyn
+        på (theta1, omega1, theta2, omega2).
+        """
+        theta1, omega1, theta2, omega2 = y
+        L1, L2, g = self.L1, self.L2, self.g
+        delta_t = theta2 - theta1
+        sin_d, cos_d = np.sin(delta_t), np.cos(delta_t)
+        sin1, cos1 = np.sin(theta1), np.cos(theta1)
+        sin2, cos2 = np.sin(theta2), np.cos(theta2)
+        cos_2d = cos_d ** 2 - sin_d ** 2
+
+        # Tellere og nevnere i domega1 og domega2, og deres deriverte
+        # med hensyn på vinkelforskjellen delta_t
+        num1 = (L1 * omega1 ** 2 * sin_d * cos_d + g * sin2 * cos_d
+                + L2 * omega2 ** 2 * sin_d - 2 * g * sin1)
+        num2 = (-L2 * omega2 ** 2 * sin_d * cos_d + 2 * g * sin1 * cos_d
+                - 2 * L1 * omega1 ** 2 * sin_d - 2 * g * sin2)
+        den1 = L1 * (2 - cos_d ** 2)
+        den2 = L2 * (2 - cos_d ** 2)
+        dnum1 = (L1 * omega1 ** 2 * cos_2d - g * sin2 * sin_d
+                 + L2 * omega2 ** 2 * cos_d)
+        dnum2 = (-L2 * omega2 ** 2 * cos_2d - 2 * g * sin1 * sin_d
+                 - 2 * L1 * omega1 ** 2 * cos_d)
+        dden1 = 2 * L1 * sin_d * cos_d
+        dden2 = 2 * L2 * sin_d * cos_d
+        # Deriverte av num/den med hensyn på delta_t
+        dq1 = dnum1 / den1 - num1 * dden1 / den1 ** 2
+        dq2 = dnum2 / den2 - num2 * dden2 / den2 ** 2
+
+        return np.array([
+            [0.0, 1.0, 0.0, 0.0],
+            [-2 * g * cos1 / den1 - dq1,
+             2 * L1 * omega1 * sin_d * cos_d / den1,
+             g * cos2 * cos_d / den1 + dq1,
+             2 * L2 * omega2 * sin_d / den1],
+            [0.0, 0.0, 0.0, 1.0],
+            [2 * g * cos1 * cos_d / den2 - dq2,
+             -4 * L1 * omega1 * sin_d / den2,
+             -2 * g * cos2 / den2 + dq2,
+             -2 * L2 * omega2 * sin_d * cos_d / den2],
+        ])
+
+    def _ensemble_rhs(self, state):
+        """
+        Vektorisert høyreside for en tilstand med form (4, N). Regner ut
+        sin og cos av vinkelforskjellen én gang per kall og returnerer de
+        deriverte som en ny (4, N) array.
+        """
+        theta1, omega1, theta2, omega2 = state
+        delta_t = theta2 - theta1
+        sin_d, cos_d = np.sin(delta_t), np.cos(delta_t)
+        sin1, sin2 = np.sin(theta1), np.sin(theta2)
+        w1_sq, w2_sq = omega1 ** 2, omega2 ** 2
+        denom = 2 - cos_d ** 2
+
+        deriv = np.empty_like(state)
+        deriv[0] = omega1
+        deriv[1] = (
+            self.L1 * w1_sq * sin_d * cos_d
+            + self.g * sin2 * cos_d
+            + self.L2 * w2_sq * sin_d
+            - 2 * self.g * sin1
+        ) / (self.L1 * denom)
+        deriv[2] = omega2
+        deriv[3] = (
+            -self.L2 * w2_sq * sin_d * cos_d
+            + 2 * self.g * sin1 * cos_d
+            - 2 * self.L1 * w1_sq * sin_d
+            - 2 * self.g * sin2
+        ) / (self.L2 * denom)
+        return deriv
+
+    def _rk4_step(self, state, h):
+        """Tar ett klassisk Runge-Kutta 4-steg for en (4, N) tilstand."""
+        k1 = self._ensemble_rhs(state)
+        k2 = self._ensemble_rhs(state + h / 2 * k1)
+        k3 = self._ensemble_rhs(state + h / 2 * k2)
+        k4 = self._ensemble_rhs(state + h * k3)
+        return state + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def solve_ensemble(self, Y0, T, dt, angle="rad", monitor=None,
+                       store=True, chunk=256):
+        """
+        Løser ODE-systemet for mange startbetingelser samtidig. Y0 har form
+        (N, 4) med radene (theta1, omega1, theta2, omega2). Alle banene
+        integreres sammen med et fast RK4-steg på et uniformt tidsgrid fra
+        0 til T, og resultatet returneres som et DoublePendulumEnsemble med
+        en array av form (N, 4, steg).
+
+        monitor er en EnergyMonitor som oppdateres med chunk steg om gangen,
+        så med max_drift stopper integrasjonen kort tid etter at driften
+        blir for stor. Med store=False lagres ikke banene, bare chunk steg
+        om gangen til monitoren, og ensemblet som returneres har bare
+        start- og sluttilstanden.
+        """
+        Y0 = np.array(Y0, dtype=float, ndmin=2)
+        if Y0.shape[1] != 4:
+            raise ValueError("Y0 must have shape (N, 4)")
+        if angle == "deg":
+            Y0[:, [0, 2]] = np.radians(Y0[:, [0, 2]])
+
+        t = time_grid(T, dt)
+        h = t[1] - t[0]
+        # Lagres som (steg, 4, N) slik at hvert steg skrives sammenhengende
+        n_buffer = len(t) if store else min(chunk, len(t))
+        out = np.empty((n_buffer, 4, len(Y0)))
+        out[0] = state = Y0.T
+        # Stegene out[sent:fill] er ikke gitt til monitoren ennå
+        fill, sent = 1, 0
+        for i in range(1, len(t)):
+            if fill == n_buffer:
+                fill = sent = 0
+            state = self._rk4_step(state, h)
+            out[fill] = state
+            fill += 1
+            if monitor is not None and fill - sent == chunk:
+                monitor.update(out[sent:fill].transpose(1, 2, 0),
+                               t[i + 1 - chunk:i + 1])
+                sent = fill
+        if monitor is not None and fill > sent:
+            monitor.update(out[sent:fill].transpose(1, 2, 0),
+                           t[len(t) - (fill - sent):])
+        if not store:
+            out = np.stack((Y0.T, state))
+            t = t[[0, -1]]
+        return DoublePendulumEnsemble(
+            t, out.transpose(2, 1, 0), self.L1, self.L2
+        )
+
+    def poincare_section(self, Y0, T, processes=None, method="DOP853",
+                         rtol=1e-9, atol=1e-9):
+        """
+        Lager Poincaré-snitt for hver startbetingelse i Y0 (form (N, 4)).
+        Hver gang theta1 krysser null med omega1 > 0 lagres (theta2,
+        omega2), med theta2 lagt i intervallet [-pi, pi). Kryssingene finnes
+        med hendelsesdeteksjon under integrasjonen, så bare punktene i
+        snittet lagres og ikke hele banen. Banene fordeles på processes
+        prosesser (standard er antall kjerner, 1 kjører i denne prosessen).
+        Returnerer en liste med en (punkter, 2) array per bane.
+        """
+        tasks = [(self, y0, T, method, rtol, atol)
+                 for y0 in np.array(Y0, dtype=float, ndmin=2)]
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes == 1:
+            return [_poincare_points(task) for task in tasks]
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(_poincare_points, tasks))
+
+    def flip_times(self, theta1, theta2, T, dt, tile=250000):
+        """
+        Lager et kart over tiden det tar før en av pendlene slår runden
+        (|theta1| eller |theta2| blir større enn pi) for alle kombinasjoner
+        av startvinklene theta1 og theta2, med omega1 = omega2 = 0.
+        Returnerer en array med form (len(theta1), len(theta2)), med nan
+        der ingen av pendlene slår runden før T.
+
+        Hele gridet integreres samtidig med RK4 og fast steg dt. Celler som
+        har slått runden fjernes fra beregningen med én gang, og celler der
+        energien er for lav til at pendlene kan slå runden tas ikke med i
+        det hele tatt. Gridet løses i biter på tile celler for å begrense
+        minnebruken.
+        """
+        theta1, theta2 = np.meshgrid(theta1, theta2, indexing="ij")
+        shape = theta1.shape
+        theta1, theta2 = theta1.ravel(), theta2.ravel()
+        n = max(int(round(T / dt)), 1)
+        h = T / n
+
+        # Laveste potensielle energi der en av pendlene står rett opp
+        threshold = self.g * min(2 * self.L2, 4 * self.L1)
+        energy = self.g * (2 * self.L1 * (1 - np.cos(theta1))
+                           + self.L2 * (1 - np.cos(theta2)))
+        can_flip = energy >= threshold
+
+        times = np.full(theta1.size, np.nan)
+        for start in range(0, theta1.size, tile):
+            index = start + np.flatnonzero(can_flip[start:start + tile])
+            times[index] = self._flip_times_tile(
+                theta1[index], theta2[index], n, h
+            )
+        return times.reshape(shape)
+
+    def _flip_times_tile(self, theta1, theta2, n, h):
+        """
+        Integrerer én bit av kartet i flip_times og returnerer tiden til
+        første runde for hver celle, eller nan om det ikke skjer før n steg.
+        """
+        state = np.zeros((4, len(theta1)))
+        state[0], state[2] = theta1, theta2
+        index = np.arange(len(theta1))
+        times = np.full(len(theta1), np.nan)
+        for k in range(1, n + 1):
+            if not index.size:
+                break
+            state = self._rk4_step(state, h)
+            flipped = (np.abs(state[0]) > np.pi) | (np.abs(state[2]) > np.pi)
+            if flipped.any():
+                times[index[flipped]] = k * h
+                state, index = state[:, ~flipped], index[~flipped]
+        return times
+
 # Oppgave 3c)
-    def solve(self, y0, T, dt, angle="rad"):
+    def solve(self, y0, T, dt, angle="rad", method="LSODA", dense=False,
+              rtol=None, atol=None, profile=False, events=None,
+              dtype=np.float64, every=1, keep_omega=True):
         """
         Beregner løsninger av ODE-systemet for 0 <= t <= T ved å bruke scipys
         innebygde metoden solve_ivp. Solve tar også inn en vinkel som enten gis
         i radianer eller grader. Har satt til radianer som standard, og dersom
         vinkelen blir gitt som grader, gjøres den om til radianer.
+
+        method velger integrasjonsmetoden i solve_ivp. For de implisitte
+        metodene (Radau, BDF og LSODA) sendes den analytiske jakobimatrisen
+        med automatisk. Med dense=True begrenses ikke steglengden til dt.
+        Løseren velger stegene selv ut fra rtol og atol (standard 1e-6 og
+        1e-9), og løsningen hentes ut på et uniformt tidsgrid med avstand dt.
+
+        Med method="midpoint" brukes i stedet den innebygde, symplektiske
+        implisitte midtpunktsmetoden med fast steg dt. Den holder
+        energifeilen begrenset over lange simuleringer.
+
+        Etter hvert kall ligger statistikk om løsningen (nfev, njev, antall
+        steg og forkastede steg, kjøretid og et histogram over
+        steglengdene) i solve_stats. Med profile=True, eller når stats_hook
+        er satt, måles også tiden brukt i høyresiden, og stats_hook kalles
+        med statistikken.
+
+        events er en eller flere hendelsesfunksjoner som sendes til
+        solve_ivp. Tidspunktene og tilstandene der de inntreffer lagres i
+        t_events og y_events, og hendelser med terminal=True stopper
+        integrasjonen.
+
+        dtype, every og keep_omega bestemmer hvordan løsningen lagres, som
+        i Pendulum.solve. Med keep_omega=False lagres bare theta1 og
+        theta2, og omega1 og omega2 kaster en AttributeError.
         """
         self.dt = dt
         if angle == "deg":
             y0[0] = np.radians(y0[0])
             y0[2] = np.radians(y0[2])
+        self._solve_info = solve_info(
+            y0, T, dt, method, dense, rtol, atol,
+            storage_policy(dtype, every, keep_omega)
+        )
+        clear_events(self)
+        t, y, stats = self._integrate(y0, 0, T, dt, method, dense, rtol, atol,
+                                      profile, events)
+        set_solution(self, t, y)
+        record_stats(self, stats)
+
+    def extend(self, T_new):
+        """
+        Fortsetter løsningen fra siste tidspunkt til T_new med de samme
+        innstillingene som i solve, i stedet for å løse på nytt fra t = 0.
+        Bare den nye delen integreres, og de mellomlagrede størrelsene
+        oppdateres bare for den nye delen.
+        """
+        extend_solution(self, T_new)
+
+    def _integrate(self, y0, t0, T, dt, method, dense, rtol, atol,
+                   profile=False, events=None):
+        """
+        Integrerer fra t0 til T og returnerer (t, y, stats). Brukes av både
+        solve og extend.
+        """
+        profile = profile or self.stats_hook is not None
+        start = time.perf_counter()
+        if method == "midpoint":
+            if events is not None:
+                raise ValueError("events are not supported with midpoint")
+            t = time_grid(T, dt, t0)
+            y = np.empty((4, len(t)))
+            _, nfev = self._implicit_midpoint(y0, t[1] - t[0], y)
+            return t, y, collect_stats(
+                method, time.perf_counter() - start, nfev,
+                step_times=t, n_rejected=0
+            )
+
+        fun = RhsTimer(self) if profile else self
+        sol = solve_ivp(
+            fun, (t0, T), y0, events=events,
+            **ivp_options(T, dt, method, dense, rtol, atol, self.jacobian, t0)
+        )
+        if events is not None:
+            self.t_events, self.y_events = sol.t_events, sol.y_events
+        return sol.t, sol.y, collect_stats(
+            method, time.perf_counter() - start, sol.nfev, sol.njev, sol.nlu,
+            step_times=None if dense else sol.t,
+            rhs_time=fun.time if profile else None,
+        )
+
+    def iter_solve(self, y0, T, dt, chunk=10000, angle="rad", method="LSODA",
+                   rtol=None, atol=None):
+        """
+        Generator som løser ODE-systemet bit for bit i stedet for å holde
+        hele løsningen i minnet. Gir tupler (t, theta1, omega1, theta2,
+        omega2) med chunk punkter hver på et uniformt tidsgrid med avstand
+        dt, og løseren beholder tilstanden sin mellom bitene. Nøyaktigheten
+        styres av rtol og atol som i solve med dense=True, og
+        method="midpoint" bruker den innebygde midtpunktsmetoden.
+        """
+        y0 = np.array(y0, dtype=float)
+        if angle == "deg":
+            y0[[0, 2]] = np.radians(y0[[0, 2]])
+
+        if method == "midpoint":
+            chunks = iter_fixed_step(
+                lambda y, h, out: self._implicit_midpoint(y, h, out)[0],
+                y0, T, dt, chunk
+            )
+        else:
+            chunks = iter_grid(self, y0, T, dt, chunk, method, rtol, atol,
+                               self.jacobian)
+        for t, y in chunks:
+            yield t, y[0], y[1], y[2], y[3]
+
+    def _implicit_midpoint(self, y0, h, out, tol=1e-12, max_iter=100):
+        """
+        Implisitt midtpunktsmetode med fast steg h. Metoden brukes på de
+        kanoniske koordinatene (theta1, theta2, p1, p2), der p er de
+        generaliserte impulsene, slik at den er symplektisk. Hvert steg løses
+        med fikspunktiterasjon. Startverdien legges i out[:, 0], og resten
+        av den ferdig allokerte (4, steg) arrayen fylles uten nye
+        allokeringer. Returnerer den siste tilstanden og antall evalueringer
+        av høyresiden.
+        """
+        L1, L2, g = self.L1, self.L2, self.g
+        sin, cos = math.sin, math.cos
+        L12 = L1 * L2
+
+        def velocities(theta1, theta2, p1, p2):
+            c = cos(theta1 - theta2)
+            det = L12 * L12 * (2 - c * c)
+            return ((L2 * L2 * p1 - L12 * c * p2) / det,
+                    (2 * L1 * L1 * p2 - L12 * c * p1) / det)
+
+        theta1, omega1, theta2, omega2 = (float(v) for v in y0)
+        c = cos(theta1 - theta2)
+        p1 = 2 * L1 * L1 * omega1 + L12 * c * omega2
+        p2 = L12 * c * omega1 + L2 * L2 * omega2
+        out[:, 0] = theta1, omega1, theta2, omega2
+        w1, w2, dp1, dp2 = omega1, omega2, 0.0, 0.0
+        nfev = 0
+
+        for i in range(1, out.shape[1]):
+            # Startgjett: et Euler-steg med høyresiden fra forrige steg
+            n_theta1, n_theta2 = theta1 + h * w1, theta2 + h * w2
+            n_p1, n_p2 = p1 + h * dp1, p2 + h * dp2
+            for _ in range(max_iter):
+                m_theta1 = (theta1 + n_theta1) / 2
+                m_theta2 = (theta2 + n_theta2) / 2
+                m_p1, m_p2 = (p1 + n_p1) / 2, (p2 + n_p2) / 2
+                w1, w2 = velocities(m_theta1, m_theta2, m_p1, m_p2)
+                coupling = L12 * w1 * w2 * sin(m_theta1 - m_theta2)
+                dp1 = -coupling - 2 * g * L1 * sin(m_theta1)
+                dp2 = coupling - g * L2 * sin(m_theta2)
+                nfev += 1
+
+                new = (theta1 + h * w1, theta2 + h * w2,
+                       p1 + h * dp1, p2 + h * dp2)
+                change = max(abs(new[0] - n_theta1), abs(new[1] - n_theta2),
+                             abs(new[2] - n_p1), abs(new[3] - n_p2))
+                n_theta1, n_theta2, n_p1, n_p2 = new
+                if change < tol * (1 + abs(n_p1) + abs(n_p2)):
+                    break
+            else:
+                raise RuntimeError(
+                    "Implicit midpoint iteration did not converge. "
+                    "Try a smaller dt."
+                )
+
+            theta1, theta2, p1, p2 = n_theta1, n_theta2, n_p1, n_p2
+            omega1, omega2 = velocities(theta1, theta2, p1, p2)
+            out[0, i], out[1, i] = theta1, omega1
+            out[2, i], out[3, i] = theta2, omega2
+        return (theta1, omega1, theta2, omega2), nfev
+
+    def _set_solution(self, t, y):
+        """Lagrer en ny løsning og sletter de mellomlagrede størrelsene."""
+        self.clear_cache()
+        self._buffer = None
+        self._cache_buffers = {}
+        self._last_state = None
+        self._set_arrays(t, y)
 
-        sol = solve_ivp(self, (0, T), y0, max_step=dt, method="LSODA")
-        self._t = sol.t
-        self._theta1, self._omega1 = sol.y[0], sol.y[1]
-        self._theta2, self._omega2 = sol.y[2], sol.y[3]
+    def _set_arrays(self, t, y):
+        """
+        Setter arrayene som t og tilstandsegenskapene returnerer. Har y bare
+        to rader, er det theta1 og theta2 (lagret uten omega).
+        """
+        self._t = t
+        if len(y) == 2:
+            self._theta1, self._theta2 = y
+            self._omega1 = self._omega2 = None
+            return
+        self._theta1, self._omega1 = y[0], y[1]
+        self._theta2, self._omega2 = y[2], y[3]
+
+    def _solution_arrays(self):
+        """
+        Returnerer t og tilstandene i samme rekkefølge som _columns, men
+        uten omega1 og omega2 om de ikke er lagret.
+        """
+        if self._omega1 is None:
+            return [self.t, self.theta1, self.theta2]
+        return [self.t, self.theta1, self.omega1, self.theta2, self.omega2]
+
+    def _parameters(self):
+        """Returnerer parameterne som trengs for å lage modellen på nytt."""
+        return {"L1": self.L1, "L2": self.L2, "g": self.g}
+
+    def clear_cache(self):
+        """
+        Sletter de mellomlagrede avledede størrelsene (posisjoner, farter og
+        energier). De regnes ut på nytt neste gang de hentes, så metoden kan
+        brukes for å frigjøre minne.
+        """
+        clear_cached_properties(self)
+
+    def memory_footprint(self):
+        """
+        Antall byte brukt av løsningen og de mellomlagrede størrelsene, som
+        en dict med nøklene solution, cache og total.
+        """
+        return memory_footprint(self)
 
 # Oppgave 3d)
     @property
@@ -112,9 +626,12 @@ class DoublePendulum:
         Lagrer omega1 som en privat attributt og kaster en AssertionError om 
         man prøver å hente den før metoden solve blir kalt på.
         """
-        if self._omega1 is None: 
+        if self._t is None: 
             raise ODEsNotSolve(
                 "No solution found. Did you remember to call solve?")
+        if self._omega1 is None:
+            raise AttributeError(
+                "omega1 was not stored. Solve with keep_omega=True.")
         return self._omega1
 
     @property
@@ -123,12 +640,15 @@ class DoublePendulum:
         Lagrer omega2 som en privat attributt og kaster en AssertionError om 
         man prøver å hente den før metoden solve blir kalt på.
         """
-        if self._omega2 is None: 
+        if self._t is None: 
             raise ODEsNotSolve(
                 "No solution found. Did you remember to call solve?")
+        if self._omega2 is None:
+            raise AttributeError(
+                "omega2 was not stored. Solve with keep_omega=True.")
         return self._omega2
 
-    @property
+    @cached_property
     def x1(self):
         """
         Returnerer en array av horisontale verdier i kartetiske koordinater lik
@@ -137,7 +657,7 @@ class DoublePendulum:
         """
         return self.L1 * np.sin(self.theta1)
 
-    @property
+    @cached_property
     def y1(self):
         """
         Returnerer en array av vertikale verdier i kartetiske koordinater lik
@@ -146,7 +666,7 @@ class DoublePendulum:
         """
         return -self.L1 * np.cos(self.theta1)
 
-    @property
+    @cached_property
     def x2(self):
         """
         Returnerer en array av vertikale verdier i kartetiske koordinater som 
@@ -154,7 +674,7 @@ class DoublePendulum:
         """
         return self.x1 + self.L2 * np.sin(self.theta2)
 
-    @property
+    @cached_property
     def y2(self):
         """
         Returnerer en array av horisontale verdier i kartetiske koordinater som 
@@ -163,7 +683,7 @@ class DoublePendulum:
         return self.y1 - self.L2 * np.cos(self.theta2)
     
 # Oppgave 3e)
-    @property
+    @cached_property
     def potential(self):
         """
         Beregner den potensielle energien, som er summen av de potensielle 
@@ -173,27 +693,27 @@ class DoublePendulum:
         p2 = self.g * (self.y2 + self.L2 + self.L1)
         return p1 + p2
 
-    @property
+    @cached_property
     def vx1(self):
         """Farten, v_x1, til x-verdiene i pendulum 1."""
         return np.gradient(self.x1, self.t)
 
-    @property
+    @cached_property
     def vy1(self):
         """Farten, v_y1, til y-verdiene i pendulum 1."""
         return np.gradient(self.y1, self.t)
 
-    @property
+    @cached_property
     def vx2(self):
         """Farten, v_x2, til x-verdiene i pendulum 2."""
         return np.gradient(self.x2, self.t)
 
-    @property
+    @cached_property
     def vy2(self):
         """Farten, v_y2, til y-verdiene i pendulum 2."""
         return np.gradient(self.y2, self.t)
 
-    @property
+    @cached_property
     def kinetic(self):
         """
         Beregner den kinetiske energien, som er summen av de kinetiske
@@ -204,29 +724,74 @@ class DoublePendulum:
         return k1 + k2
 
 
+    def state_energy(self, state):
+        """
+        Den totale energien regnet ut analytisk fra tilstanden (theta1,
+        omega1, theta2, omega2), med samme nullpunkt som potential. state
+        kan ha flere akser etter de fire variablene, for eksempel (4, N)
+        for et ensemble.
+        """
+        theta1, omega1, theta2, omega2 = state[0], state[1], state[2], state[3]
+        L1, L2 = self.L1, self.L2
+        kinetic = 1/2 * (
+            2 * L1 ** 2 * omega1 ** 2 + L2 ** 2 * omega2 ** 2
+            + 2 * L1 * L2 * omega1 * omega2 * np.cos(theta1 - theta2)
+        )
+        potential = self.g * (
+            2 * L1 * (1 - np.cos(theta1)) + L2 * (1 - np.cos(theta2))
+        )
+        return kinetic + potential
+
+
 # Oppgave 4a)
-    def create_animation(self):
+    def frame_coordinates(self, fps=60):
+        """
+        Lager en kompakt buffer med koordinatene som skal tegnes i hvert
+        bilde av animasjonen. Løsningen samples om til et uniformt tidsgrid
+        med fps bilder per sekund (i stedet for ett bilde per steg fra
+        løseren), og bufferen har form (bilder, 3, 2) med (x, y) for
+        festepunktet og de to massene.
+        """
+        n_frames = int(np.floor(self.t[-1] * fps + 1e-9)) + 1
+        t_frames = np.arange(n_frames) / fps
+        theta1 = np.interp(t_frames, self.t, self.theta1)
+        theta2 = np.interp(t_frames, self.t, self.theta2)
+
+        frames = np.zeros((n_frames, 3, 2))
+        frames[:, 1, 0] = self.L1 * np.sin(theta1)
+        frames[:, 1, 1] = -self.L1 * np.cos(theta1)
+        frames[:, 2, 0] = frames[:, 1, 0] + self.L2 * np.sin(theta2)
+        frames[:, 2, 1] = frames[:, 1, 1] - self.L2 * np.cos(theta2)
+        return frames
+
+    def create_animation(self, fps=60, trail=0):
         """
         Setter opp en figur og setter sammen figuren ved hjelp av 
-        akser, navngivning, tittel og lignende.
+        akser, navngivning, tittel og lignende. Koordinatene regnes ut én
+        gang med frame_coordinates, og trail gir antall bilder bakover i tid
+        som den andre massen skal etterlate seg et spor.
         """
+        import matplotlib.pyplot as plt
+        from matplotlib import animation
+
+        self.fps = fps
+        self.trail = trail
+        self._frames = self.frame_coordinates(fps)
+
         # Create empty figure
         fig = plt.figure()
             
-        # Configure figure
-        plt.axis('equal')
-        plt.axis('off')
-        plt.axis((-3, 3, -3, 3))
-            
-        # Make an "empty" plot object to be updated throughout the animation
-        self.pendulums, = plt.plot([], [], 'o-', lw=2)
+        # Configure figure and make "empty" plot objects to be updated
+        # throughout the animation
+        self.trace, self.pendulums = setup_axes(fig.gca(),
+                                                self.animation_reach)
             
         # Call FuncAnimation
         self.animation = animation.FuncAnimation(fig,
                                                 self._next_frame,
-                                                frames=range(len(self.x1)), 
+                                                frames=len(self._frames), 
                                                 repeat=None,
-                                                interval=1000*self.dt, 
+                                                interval=1000/fps, 
                                                 blit=True)
 
     def _next_frame(self, i):
@@ -234,21 +799,27 @@ class DoublePendulum:
         Tar inn et tall, i, og oppdaterer figuren for hvert bilde i 
         animasjonen.
         """
-        self.pendulums.set_data((0, self.x1[i], self.x2[i]),
-                                (0, self.y1[i], self.y2[i]))
-        return self.pendulums,
+        frame = self._frames[i]
+        self.pendulums.set_data(frame[:, 0], frame[:, 1])
+        if self.trail:
+            trace = self._frames[max(i - self.trail, 0):i + 1, 2]
+            self.trace.set_data(trace[:, 0], trace[:, 1])
+        return self.trace, self.pendulums
 
     def show_animation(self):
         """Viser animasjonen."""
+        import matplotlib.pyplot as plt
         plt.show()
 
     def save_animation(self, filename):
-        """Lagrer animasjonen."""
-        self.animation.save(filename, fps=60)
+        """Lagrer animasjonen med samme fps som den ble laget med."""
+        self.animation.save(filename, fps=self.fps)
 
 
 if __name__ == '__main__': 
     """Plotter den dobble pendulumen fra oppg. 3 og animasjonen fra oppg. 4."""
+    import matplotlib.pyplot as plt
+
     # Plotter den dobble pendulumen fra oppgave 3
     pend = DoublePendulum()
     pend.solve((3 * np.pi / 7, 1, 3 * np.pi / 4, 1), 10, 0.01)
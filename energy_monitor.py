@@ -0,0 +1,117 @@
+import numpy as np
+
+
+class EnergyDriftExceeded(RuntimeError):
+    """Kastes av EnergyMonitor når energidriften blir større enn max_drift."""
+
+
+class EnergyMonitor:
+    """
+    Følger med på den totale energien til en modell mens den løses, uten å
+    lagre løsningen. Energien regnes ut analytisk fra tilstanden med
+    model.state_energy (i stedet for med np.gradient på posisjonene), og
+    minimum, maksimum, gjennomsnitt, varians og den største relative
+    driften |E - E0| / |E0| oppdateres for hver bit som kommer inn, med
+    konstant minne. Er E0 = 0 brukes den absolutte driften.
+
+    Tilstandene kan ha flere akser etter variablene, for eksempel
+    (4, N) for et ensemble med N baner, og da holdes statistikken for hver
+    bane for seg. Med max_drift satt kastes en EnergyDriftExceeded så
+    snart driften blir større.
+    """
+    def __init__(self, model, max_drift=None):
+        self.model = model
+        self.max_drift = max_drift
+        self.count = 0
+        self.initial = None
+        self._mean = self._m2 = None
+        self.min = self.max = self.drift = None
+
+    def update(self, state, t=None):
+        """
+        Legger til en bit av løsningen. state har form (variabler, ...,
+        punkter) med variablene i samme rekkefølge som i modellen, og t er
+        tidspunktene (brukes bare i feilmeldingen).
+        """
+        energy = np.asarray(self.model.state_energy(np.asarray(state)))
+        n = energy.shape[-1]
+        if n == 0:
+            return
+        if self.initial is None:
+            self.initial = energy[..., 0]
+            self._scale = np.where(self.initial != 0, np.abs(self.initial), 1)
+
+        mean = energy.mean(axis=-1)
+        m2 = ((energy - mean[..., np.newaxis]) ** 2).sum(axis=-1)
+        deviation = np.abs(energy - self.initial[..., np.newaxis])
+        drift = deviation.max(axis=-1) / self._scale
+        if self.count == 0:
+            self._mean, self._m2 = mean, m2
+            self.min, self.max = energy.min(axis=-1), energy.max(axis=-1)
+            self.drift = drift
+        else:
+            # Slår sammen med statistikken så langt (Chan et al.)
+            total = self.count + n
+            delta = mean - self._mean
+            self._mean = self._mean + delta * n / total
+            self._m2 = self._m2 + m2 + delta ** 2 * self.count * n / total
+            self.min = np.minimum(self.min, energy.min(axis=-1))
+            self.max = np.maximum(self.max, energy.max(axis=-1))
+            self.drift = np.maximum(self.drift, drift)
+        self.count += n
+
+        if self.max_drift is not None and np.any(drift > self.max_drift):
+            where = ""
+            if t is not None:
+                exceeded = np.any(
+                    deviation / self._scale[..., np.newaxis] > self.max_drift,
+                    axis=tuple(range(deviation.ndim - 1))
+                )
+                where = f" at t = {np.asarray(t)[np.argmax(exceeded)]:.6g}"
+            raise EnergyDriftExceeded(
+                f"Relative energy drift {np.max(drift):.3e} exceeds "
+                f"{self.max_drift:.3e}{where}"
+            )
+
+    def watch(self, chunks):
+        """
+        Tar inn bitene fra iter_solve, oppdaterer statistikken med hver bit
+        og gir dem videre uendret, for eksempel
+        for t, theta, omega in monitor.watch(pend.iter_solve(...)).
+        """
+        for chunk in chunks:
+            self.update(np.vstack(chunk[1:]), chunk[0])
+            yield chunk
+
+    def run(self, chunks):
+        """Går gjennom alle bitene fra iter_solve og returnerer monitoren."""
+        for _ in self.watch(chunks):
+            pass
+        return self
+
+    @property
+    def mean(self):
+        """Gjennomsnittet av den totale energien."""
+        return self._mean
+
+    @property
+    def variance(self):
+        """Variansen til den totale energien."""
+        if self.count == 0:
+            return None
+        return self._m2 / self.count
+
+    @property
+    def std(self):
+        """Standardavviket til den totale energien."""
+        if self.count == 0:
+            return None
+        return np.sqrt(self.variance)
+
+    def summary(self):
+        """Returnerer statistikken så langt som en dict."""
+        return {
+            "count": self.count, "min": self.min, "max": self.max,
+            "mean": self.mean, "variance": self.variance,
+            "drift": self.drift,
+        }
@@ -1,14 +1,22 @@
+import time
+
 import numpy as np
 from scipy.integrate import solve_ivp
-import matplotlib.pyplot as plt
+from solver_tools import RhsTimer, collect_stats, record_stats, solve_info
 
 
 class ExponentialDecay:
+    # Navnene på kolonnene i en lagret løsning
+    _columns = ("t", "u")
+    # Kalles med solve_stats etter hvert kall på solve om den er satt
+    stats_hook = None
+
     def __init__(self, a):
         """Tar inn en konstant a som kun kan være positiv."""
         self.a = a
         if a < 0:
             raise ValueError("The constant a cannot be negative")
+        self._solved = False
 
     def __call__(self, t, u):
         """
@@ -19,15 +27,93 @@ class ExponentialDecay:
         return du_dt
 
     # Oppgave 1c)
-    def solve(self, u0, T, dt):
-        """Beregner løsninger av ODE-systemet for 0 <= t <= T"""
-        sol = solve_ivp(self, (0, T), [u0],
-                        t_eval=np.linspace(0, T, dt))
-        return sol.t, sol.y[0]
+    def solve(self, u0, T, dt, exact=False, profile=False):
+        """
+        Beregner løsninger av ODE-systemet for 0 <= t <= T. Løsningen
+        returneres som (t, u) og lagres også i modellen. Med exact=True
+        brukes den analytiske løsningen u0 * exp(-a t) i stedet for
+        solve_ivp, på det samme tidsgridet. Statistikk om løsningen lagres
+        i solve_stats som for pendlene.
+        """
+        start = time.perf_counter()
+        t = np.linspace(0, T, dt)
+        if exact:
+            self._solve_info = solve_info([u0], T, dt, "exact")
+            result = self._set_solution(t, [u0 * np.exp(-self.a * t)])
+            record_stats(self, collect_stats(
+                "exact", time.perf_counter() - start, 0
+            ))
+            return result
+
+        self._solve_info = solve_info([u0], T, dt, "RK45")
+        profile = profile or self.stats_hook is not None
+        fun = RhsTimer(self) if profile else self
+        sol = solve_ivp(fun, (0, T), [u0], t_eval=t)
+        result = self._set_solution(sol.t, sol.y)
+        record_stats(self, collect_stats(
+            "RK45", time.perf_counter() - start, sol.nfev,
+            rhs_time=fun.time if profile else None,
+        ))
+        return result
+
+    @staticmethod
+    def solve_batch(a, u0, T, dt):
+        """
+        Regner ut den analytiske løsningen for mange konstanter a og
+        startverdier u0 samtidig, på det samme tidsgridet som solve.
+        Returnerer (t, u) der u har form (len(a), len(u0), len(t)).
+        """
+        a = np.asarray(a, dtype=float).reshape(-1)
+        u0 = np.asarray(u0, dtype=float).reshape(-1)
+        if np.any(a < 0):
+            raise ValueError("The constant a cannot be negative")
+        t = np.linspace(0, T, dt)
+        decay = np.exp(-np.multiply.outer(a, t))
+        return t, u0[np.newaxis, :, np.newaxis] * decay[:, np.newaxis, :]
+
+    def _set_solution(self, t, y):
+        """Lagrer en ny løsning og returnerer den som (t, u)."""
+        self._t, self._u = t, y[0]
+        self._solved = True
+        return self._t, self._u
+
+    def _solution_arrays(self):
+        """Returnerer t og u i samme rekkefølge som _columns."""
+        return [self.t, self.u]
+
+    def _parameters(self):
+        """Returnerer parameterne som trengs for å lage modellen på nytt."""
+        return {"a": self.a}
+
+    @property
+    def t(self):
+        """
+        Tidspunktene fra siste kall på solve. Kaster en AssertionError om
+        solve ikke er kalt ennå.
+        """
+        if not self._solved:
+            raise AssertionError(
+                "No solution found. Did you remember to call solve?"
+            )
+        return self._t
+
+    @property
+    def u(self):
+        """
+        Løsningen u fra siste kall på solve. Kaster en AssertionError om
+        solve ikke er kalt ennå.
+        """
+        if not self._solved:
+            raise AssertionError(
+                "No solution found. Did you remember to call solve?"
+            )
+        return self._u
 
 
 if __name__ == '__main__':
     """Tester solve metoden i en egen test-blokk, og plotter funksjonene."""
+    import matplotlib.pyplot as plt
+
     a = 0.05
     u0_list = [2, 4, 8, 12]
     T = 100
@@ -0,0 +1,356 @@
+import time
+from functools import cached_property
+
+import numpy as np
+from animation_export import AnimationExportMixin, setup_axes
+from double_pendulum import ODEsNotSolve
+from plotting import PlotMixin
+from scipy.integrate import solve_ivp
+from scipy.linalg import solve_banded
+from solver_tools import (
+    RhsTimer, clear_cached_properties, clear_events, collect_stats,
+    extend_solution, ivp_options, iter_grid, memory_footprint, record_stats,
+    set_solution, solve_info, storage_policy,
+)
+
+
+class NPendulum(PlotMixin, AnimationExportMixin):
+    """
+    En kjede med N pendler, der pendel nummer i + 1 er festet i massen til
+    pendel nummer i. For N = 2 er dette den samme modellen som
+    DoublePendulum (med M = 1).
+
+    Høyresiden regnes ut i lineær tid i N. Kreftene i trådene (snorkreftene)
+    T_1, ..., T_N bestemmes av at lengden av hver tråd er konstant, som gir
+    et tridiagonalt ligningssystem der rad i bare avhenger av nabotrådene
+    i - 1 og i + 1. Det løses med solve_banded, og vinkelakselerasjonene
+    følger direkte av snorkreftene. Da slipper vi å sette opp og løse den
+    fulle massematrisen, som koster O(N^3) per kall.
+
+    Tilstanden y er [theta_1, ..., theta_N, omega_1, ..., omega_N].
+    """
+    # Kalles med solve_stats etter hvert kall på solve om den er satt
+    stats_hook = None
+
+    def __init__(self, N=3, L=1, M=1, g=9.81):
+        """
+        Tar inn antall pendler N, lengdene L og massene M, som enten er ett
+        tall for alle pendlene eller en liste med N verdier, og
+        tyngdeakselerasjonen g.
+        """
+        self.N = N
+        self.L = np.broadcast_to(np.asarray(L, dtype=float), (N,)).copy()
+        self.M = np.broadcast_to(np.asarray(M, dtype=float), (N,)).copy()
+        self.g = g
+        self._columns = ("t",) + tuple(f"theta{i}" for i in range(1, N + 1)) \
+            + tuple(f"omega{i}" for i in range(1, N + 1))
+        self._t, self._theta, self._omega = None, None, None
+        # Radene i tilstanden som er vinkler
+        self._angle_rows = range(N)
+
+        # Faste deler av det tridiagonale systemet for snorkreftene
+        inv_m = 1 / self.M
+        self._inv_m = inv_m[:-1]
+        self._diagonal = -(inv_m + np.concatenate(([0.0], inv_m[:-1])))
+        self._bands = np.zeros((3, N))
+        self._bands[1] = self._diagonal
+
+    def __call__(self, t, y):
+        """
+        Tar inn parameterne t og y, og returnerer de deriverte av alle
+        vinklene og vinkelhastighetene (h.s. av ODE-systemet).
+        """
+        N = self.N
+        theta, omega = y[:N], y[N:]
+        delta = np.diff(theta)
+        cos_delta, sin_delta = np.cos(delta), np.sin(delta)
+
+        # Rad i: T_(i-1) cos/m_(i-1) - (1/m_i + 1/m_(i-1)) T_i
+        #        + T_(i+1) cos/m_i = -L_i omega_i^2 (- g cos theta_1 for i = 1)
+        bands = self._bands
+        bands[0, 1:] = bands[2, :-1] = cos_delta * self._inv_m
+        rhs = -self.L * omega ** 2
+        rhs[0] -= self.g * np.cos(theta[0])
+        tension = solve_banded((1, 1), bands, rhs, overwrite_b=True,
+                               check_finite=False)
+
+        torque = sin_delta * self._inv_m
+        alpha = np.zeros(N)
+        alpha[:-1] += tension[1:] * torque
+        alpha[1:] -= tension[:-1] * torque
+        alpha[0] -= self.g * np.sin(theta[0])
+        return np.concatenate((omega, alpha / self.L))
+
+    def solve(self, y0, T, dt, angle="rad", method="LSODA", dense=False,
+              rtol=None, atol=None, profile=False, events=None,
+              dtype=np.float64, every=1, keep_omega=True):
+        """
+        Beregner løsninger av ODE-systemet for 0 <= t <= T med solve_ivp, på
+        samme måte og med de samme argumentene som DoublePendulum.solve. y0
+        er [theta_1, ..., theta_N, omega_1, ..., omega_N], og med
+        angle="deg" gjøres vinklene om fra grader til radianer. dtype, every
+        og keep_omega bestemmer hvordan løsningen lagres, som i
+        Pendulum.solve.
+        """
+        y0 = np.array(y0, dtype=float)
+        if angle == "deg":
+            y0[:self.N] = np.radians(y0[:self.N])
+        self.dt = dt
+        self._solve_info = solve_info(
+            y0, T, dt, method, dense, rtol, atol,
+            storage_policy(dtype, every, keep_omega)
+        )
+        clear_events(self)
+        t, y, stats = self._integrate(y0, 0, T, dt, method, dense, rtol, atol,
+                                      profile, events)
+        set_solution(self, t, y)
+        record_stats(self, stats)
+
+    def extend(self, T_new):
+        """
+        Fortsetter løsningen fra siste tidspunkt til T_new med de samme
+        innstillingene som i solve.
+        """
+        extend_solution(self, T_new)
+
+    def _integrate(self, y0, t0, T, dt, method, dense, rtol, atol,
+                   profile=False, events=None):
+        """
+        Integrerer fra t0 til T og returnerer (t, y, stats). Brukes av både
+        solve og extend.
+        """
+        profile = profile or self.stats_hook is not None
+        start = time.perf_counter()
+        fun = RhsTimer(self) if profile else self
+        sol = solve_ivp(
+            fun, (t0, T), y0, events=events,
+            **ivp_options(T, dt, method, dense, rtol, atol, t0=t0)
+        )
+        if events is not None:
+            self.t_events, self.y_events = sol.t_events, sol.y_events
+        return sol.t, sol.y, collect_stats(
+            method, time.perf_counter() - start, sol.nfev, sol.njev, sol.nlu,
+            step_times=None if dense else sol.t,
+            rhs_time=fun.time if profile else None,
+        )
+
+    def iter_solve(self, y0, T, dt, chunk=10000, angle="rad", method="LSODA",
+                   rtol=None, atol=None):
+        """
+        Generator som løser ODE-systemet bit for bit, som
+        DoublePendulum.iter_solve. Gir tupler (t, theta, omega) der theta og
+        omega har form (N, punkter).
+        """
+        y0 = np.array(y0, dtype=float)
+        if angle == "deg":
+            y0[:self.N] = np.radians(y0[:self.N])
+        for t, y in iter_grid(self, y0, T, dt, chunk, method, rtol, atol):
+            yield t, y[:self.N], y[self.N:]
+
+    def _set_solution(self, t, y):
+        """Lagrer en ny løsning og sletter de mellomlagrede størrelsene."""
+        self.clear_cache()
+        self._buffer = None
+        self._cache_buffers = {}
+        self._last_state = None
+        self._set_arrays(t, y)
+
+    def _set_arrays(self, t, y):
+        """
+        Setter arrayene som t, theta og omega returnerer. Har y bare N
+        rader, er omega ikke lagret.
+        """
+        y = np.asarray(y)
+        self._t = t
+        self._theta = y[:self.N]
+        self._omega = y[self.N:] if len(y) > self.N else None
+
+    def _solution_arrays(self):
+        """
+        Returnerer t og tilstandene i samme rekkefølge som _columns, men
+        uten omega om den ikke er lagret.
+        """
+        if self._omega is None:
+            return [self.t, *self.theta]
+        return [self.t, *self.theta, *self.omega]
+
+    def _parameters(self):
+        """Returnerer parameterne som trengs for å lage modellen på nytt."""
+        return {"N": self.N, "L": self.L.tolist(), "M": self.M.tolist(),
+                "g": self.g}
+
+    def clear_cache(self):
+        """
+        Sletter de mellomlagrede avledede størrelsene (posisjoner, farter og
+        energier), så de regnes ut på nytt neste gang de hentes.
+        """
+        clear_cached_properties(self)
+
+    def memory_footprint(self):
+        """
+        Antall byte brukt av løsningen og de mellomlagrede størrelsene, som
+        en dict med nøklene solution, cache og total.
+        """
+        return memory_footprint(self)
+
+    @property
+    def t(self):
+        """
+        Tidspunktene fra siste kall på solve. Kaster en ODEsNotSolve om solve
+        ikke er kalt ennå.
+        """
+        if self._t is None:
+            raise ODEsNotSolve(
+                "No solution found. Did you remember to call solve?")
+        return self._t
+
+    @property
+    def theta(self):
+        """Vinklene til alle pendlene, form (N, steg)."""
+        if self._theta is None:
+            raise ODEsNotSolve(
+                "No solution found. Did you remember to call solve?")
+        return self._theta
+
+    @property
+    def omega(self):
+        """
+        Vinkelhastighetene til alle pendlene, form (N, steg). Kaster en
+        AttributeError om løsningen er lagret uten omega.
+        """
+        if self._t is None:
+            raise ODEsNotSolve(
+                "No solution found. Did you remember to call solve?")
+        if self._omega is None:
+            raise AttributeError(
+                "omega was not stored. Solve with keep_omega=True.")
+        return self._omega
+
+    @cached_property
+    def x(self):
+        """
+        Horisontal posisjon til alle massene, form (N, steg), med origo i
+        festepunktet til den første pendelen.
+        """
+        return np.cumsum(self.L[:, np.newaxis] * np.sin(self.theta), axis=0)
+
+    @cached_property
+    def y(self):
+        """Vertikal posisjon til alle massene, form (N, steg)."""
+        return np.cumsum(-self.L[:, np.newaxis] * np.cos(self.theta), axis=0)
+
+    @cached_property
+    def potential(self):
+        """
+        Den potensielle energien til hele kjeden, med nullpunkt når alle
+        pendlene henger rett ned (som i DoublePendulum).
+        """
+        height = self.y + np.cumsum(self.L)[:, np.newaxis]
+        return self.g * self.M @ height
+
+    @cached_property
+    def vx(self):
+        """Farten i x-retning til alle massene, form (N, steg)."""
+        return np.gradient(self.x, self.t, axis=1)
+
+    @cached_property
+    def vy(self):
+        """Farten i y-retning til alle massene, form (N, steg)."""
+        return np.gradient(self.y, self.t, axis=1)
+
+    @cached_property
+    def kinetic(self):
+        """Den kinetiske energien til hele kjeden."""
+        return 1/2 * self.M @ (self.vx**2 + self.vy**2)
+
+    def state_energy(self, state):
+        """
+        Den totale energien regnet ut analytisk fra tilstanden [theta_1,
+        ..., theta_N, omega_1, ..., omega_N], med samme nullpunkt som
+        potential. Farten til masse i er summen av L_j omega_j over
+        pendlene j <= i, så også dette er lineært i N. state kan ha flere
+        akser etter variablene.
+        """
+        state = np.asarray(state)
+        theta, omega = state[:self.N], state[self.N:]
+        L = self.L.reshape((-1,) + (1,) * (theta.ndim - 1))
+        M = self.M.reshape(L.shape)
+        vx = np.cumsum(L * omega * np.cos(theta), axis=0)
+        vy = np.cumsum(L * omega * np.sin(theta), axis=0)
+        height = np.cumsum(L * (1 - np.cos(theta)), axis=0)
+        return (M * (1/2 * (vx ** 2 + vy ** 2) + self.g * height)).sum(axis=0)
+
+    @property
+    def animation_reach(self):
+        """Halve bredden av området animasjonen viser, litt mer enn kjeden."""
+        return 1.1 * self.L.sum()
+
+    def frame_coordinates(self, fps=60):
+        """
+        Lager bufferen med koordinatene som tegnes i hvert bilde av
+        animasjonen, som DoublePendulum.frame_coordinates. Bufferen har form
+        (bilder, N + 1, 2) med (x, y) for festepunktet og alle massene.
+        """
+        n_frames = int(np.floor(self.t[-1] * fps + 1e-9)) + 1
+        t_frames = np.arange(n_frames) / fps
+        theta = np.array([np.interp(t_frames, self.t, row)
+                          for row in self.theta])
+
+        frames = np.zeros((n_frames, self.N + 1, 2))
+        frames[:, 1:, 0] = np.cumsum(self.L[:, np.newaxis] * np.sin(theta),
+                                     axis=0).T
+        frames[:, 1:, 1] = np.cumsum(-self.L[:, np.newaxis] * np.cos(theta),
+                                     axis=0).T
+        return frames
+
+    def create_animation(self, fps=60, trail=0):
+        """
+        Setter opp figuren og animasjonen av kjeden. trail gir antall bilder
+        bakover i tid som den siste massen etterlater seg et spor.
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib import animation
+
+        self.fps = fps
+        self.trail = trail
+        self._frames = self.frame_coordinates(fps)
+
+        fig = plt.figure()
+        self.trace, self.pendulums = setup_axes(fig.gca(),
+                                                self.animation_reach)
+
+        self.animation = animation.FuncAnimation(fig,
+                                                 self._next_frame,
+                                                 frames=len(self._frames),
+                                                 repeat=None,
+                                                 interval=1000/fps,
+                                                 blit=True)
+
+    def _next_frame(self, i):
+        """Oppdaterer figuren for bilde nummer i i animasjonen."""
+        frame = self._frames[i]
+        self.pendulums.set_data(frame[:, 0], frame[:, 1])
+        if self.trail:
+            trace = self._frames[max(i - self.trail, 0):i + 1, -1]
+            self.trace.set_data(trace[:, 0], trace[:, 1])
+        return self.trace, self.pendulums
+
+    def show_animation(self):
+        """Viser animasjonen."""
+        import matplotlib.pyplot as plt
+        plt.show()
+
+    def save_animation(self, filename):
+        """Lagrer animasjonen med samme fps som den ble laget med."""
+        self.animation.save(filename, fps=self.fps)
+
+
+if __name__ == '__main__':
+    """Animerer en kjede med fem pendler."""
+    import matplotlib.pyplot as plt
+
+    chain = NPendulum(5)
+    chain.solve([np.pi / 2] * 5 + [0] * 5, 10, 0.01)
+    chain.create_animation(trail=60)
+    plt.title("Animation of a chain of five pendulums")
+    chain.show_animation()
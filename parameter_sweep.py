@@ -0,0 +1,94 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from shared_results import attach
+
+
+def parameter_grid(**axes):
+    """
+    Lager alle kombinasjoner av verdiene i axes, for eksempel
+    parameter_grid(L=[1, 2], B=[0.1, 0.2]). Rekkefølgen er alltid den samme,
+    med den siste aksen som varierer raskest. Aksen y0 brukes som
+    startbetingelse i stedet for som parameter til modellen.
+    """
+    names = list(axes)
+    return [dict(zip(names, values))
+            for values in itertools.product(*axes.values())]
+
+
+def final_state(model):
+    """Reduksjon som returnerer den siste tilstanden i løsningen."""
+    return np.array([array[-1] for array in model._solution_arrays()[1:]])
+
+
+def max_energy_drift(model):
+    """
+    Reduksjon som returnerer det største avviket i total energi fra
+    startverdien.
+    """
+    energy = model.kinetic + model.potential
+    return float(np.max(np.abs(energy - energy[0])))
+
+
+def _run_point(task):
+    """
+    Løser ett punkt i gridet og reduserer løsningen i arbeidsprosessen. Er
+    target gitt, skrives resultatet inn i rad k der i stedet for å
+    returneres.
+    """
+    model_cls, point, y0, T, dt, reduce, solve_kwargs, target, k = task
+    parameters = dict(point)
+    y0 = parameters.pop("y0", y0)
+    # solve kan endre y0 (grader til radianer), så lister får en kopi
+    y0 = list(y0) if np.ndim(y0) else y0
+    model = model_cls(**parameters)
+    model.solve(y0, T, dt, **solve_kwargs)
+    if target is None:
+        return reduce(model)
+    array = attach(target) if isinstance(target, tuple) else target
+    array[k] = reduce(model)
+
+
+def run_sweep(model_cls, grid, y0, T, dt, reduce=final_state, processes=None,
+              chunksize=None, out=None, **solve_kwargs):
+    """
+    Løser model_cls for hvert punkt i grid (en liste av dicts med
+    parametere, se parameter_grid) fordelt på en prosesspool, og returnerer
+    resultatene i samme rekkefølge som gridet. reduce kalles på den løste
+    modellen i arbeidsprosessen, så bare det reduserte resultatet sendes
+    tilbake og ikke hele løsningen. reduce må være en funksjon på
+    modulnivå slik at den kan sendes til prosessene.
+
+    processes er antall prosesser (standard er antall kjerner), og
+    processes=1 kjører alt i denne prosessen. chunksize er antall punkter
+    som sendes til en prosess om gangen. Som standard deles gridet i omtrent
+    fire biter per prosess. Resten av nøkkelordargumentene sendes videre
+    til solve.
+
+    out er en valgfri SharedResults med form (len(grid), ...). Da skriver
+    hver arbeidsprosess resultatet fra reduce rett inn i sin rad i det
+    delte minnet i stedet for å sende det tilbake, og out.array
+    returneres.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if out is None:
+        targets = [None] * len(grid)
+    elif out.shape[0] != len(grid):
+        raise ValueError("out must have one row per point in the grid")
+    else:
+        target = out.array if processes == 1 else out.spec
+        targets = [target] * len(grid)
+    tasks = [(model_cls, point, y0, T, dt, reduce, solve_kwargs, target, k)
+             for k, (point, target) in enumerate(zip(grid, targets))]
+    if processes == 1:
+        results = [_run_point(task) for task in tasks]
+        return results if out is None else out.array
+
+    if chunksize is None:
+        chunksize = max(len(tasks) // (4 * processes), 1)
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(_run_point, tasks, chunksize=chunksize))
+    return results if out is None else out.array
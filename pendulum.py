@@ -1,14 +1,34 @@
+import math
+import time
+from functools import cached_property
+
 import numpy as np
+from plotting import PlotMixin
 from scipy.integrate import solve_ivp
-import matplotlib.pyplot as plt
+from scipy.special import ellipk
+from solver_tools import (
+    RhsTimer, clear_cached_properties, clear_events, collect_stats,
+    extend_solution, ivp_options, iter_fixed_step, iter_grid,
+    memory_footprint, record_stats, set_solution, solve_info, storage_policy,
+    time_grid,
+)
 
 
 # Oppgave 2a)
-class Pendulum:
+class Pendulum(PlotMixin):
     """
     Klasse Pendulum som består av en masse, M, og en masseløs tråd, L, som 
     beregner hvordan en pendulum oppfører seg når den svinger fritt fra et 
     festepunkt og bare blir påvirka av tyngdekraften g."""
+    # Dempekoeffisient, som bare er ulik null i DampenedPendulum
+    _B = 0
+    # Kalles med solve_stats etter hvert kall på solve om den er satt
+    stats_hook = None
+    # Navnene på kolonnene i en lagret løsning
+    _columns = ("t", "theta", "omega")
+    # Radene i tilstanden som er vinkler (og beholdes med keep_omega=False)
+    _angle_rows = (0,)
+
     def __init__(self, L=1, M=1, g=9.81):
         """
         Tar inn parameterne L, M og g. Om noe annet ikke er gitt så er 
@@ -29,22 +49,197 @@ class Pendulum:
         omega_deriv = -self.g / self.L * np.sin(theta)
         return theta_deriv, omega_deriv
 
+    def jacobian(self, t, y):
+        """
+        Returnerer jakobimatrisen til høyresiden, altså de partiellderiverte
+        av (theta', omega') med hensyn på (theta, omega).
+        """
+        theta, omega = y
+        return np.array([
+            [0.0, 1.0],
+            [-self.g / self.L * np.cos(theta), 0.0],
+        ])
+
 # Oppgave 2c)
-    def solve(self, y0, T, dt, angle="rad"):
+    def solve(self, y0, T, dt, angle="rad", method="RK45", dense=False,
+              rtol=None, atol=None, profile=False, events=None,
+              dtype=np.float64, every=1, keep_omega=True):
         """
         Beregner løsninger av ODE-systemet for 0 <= t <= T ved å bruke scipys
         innebygde metoden solve_ivp. Solve tar også inn en vinkel som enten gis
         i radianer eller grader. Har satt til radianer som standard, og dersom
         vinkelen blir gitt som grader, gjøres den om til radianer.
+
+        method velger integrasjonsmetoden i solve_ivp. For de implisitte
+        metodene (Radau, BDF og LSODA) sendes den analytiske jakobimatrisen
+        med automatisk. Med dense=True begrenses ikke steglengden til dt.
+        Løseren velger stegene selv ut fra rtol og atol (standard 1e-6 og
+        1e-9), og løsningen hentes ut på et uniformt tidsgrid med avstand dt.
+
+        Med method="verlet" brukes i stedet den innebygde, symplektiske
+        velocity-Verlet-metoden med fast steg dt. Den holder energifeilen
+        begrenset over lange simuleringer.
+
+        Etter hvert kall ligger statistikk om løsningen (nfev, njev, antall
+        steg og forkastede steg, kjøretid og et histogram over
+        steglengdene) i solve_stats. Med profile=True, eller når stats_hook
+        er satt, måles også tiden brukt i høyresiden, og stats_hook kalles
+        med statistikken.
+
+        events er en eller flere hendelsesfunksjoner som sendes til
+        solve_ivp, for eksempel zero_crossing, apex eller amplitude_below.
+        Tidspunktene og tilstandene der de inntreffer lagres i t_events og
+        y_events, og hendelser med terminal=True stopper integrasjonen.
+
+        dtype, every og keep_omega bestemmer hvordan løsningen lagres: som
+        float32 eller float64, bare hvert every-te steg (det siste steget
+        beholdes alltid), og med keep_omega=False uten omega. Sammen med
+        dense=True, som gir et uniformt tidsgrid, kan minnebruken til lange
+        løsninger kuttes flere ganger. Se memory_footprint.
         """
         if angle == "deg":
             y0[0] = np.radians(y0[0])
+        self._solve_info = solve_info(
+            y0, T, dt, method, dense, rtol, atol,
+            storage_policy(dtype, every, keep_omega)
+        )
+        clear_events(self)
+        t, y, stats = self._integrate(y0, 0, T, dt, method, dense, rtol, atol,
+                                      profile, events)
+        set_solution(self, t, y)
+        record_stats(self, stats)
+
+    def extend(self, T_new):
+        """
+        Fortsetter løsningen fra siste tidspunkt til T_new med de samme
+        innstillingene som i solve, i stedet for å løse på nytt fra t = 0.
+        Bare den nye delen integreres, og de mellomlagrede størrelsene
+        oppdateres bare for den nye delen.
+        """
+        extend_solution(self, T_new)
+
+    def _integrate(self, y0, t0, T, dt, method, dense, rtol, atol,
+                   profile=False, events=None):
+        """
+        Integrerer fra t0 til T og returnerer (t, y, stats). Brukes av både
+        solve og extend.
+        """
+        profile = profile or self.stats_hook is not None
+        start = time.perf_counter()
+        if method == "verlet":
+            if events is not None:
+                raise ValueError("events are not supported with verlet")
+            t = time_grid(T, dt, t0)
+            y = np.empty((2, len(t)))
+            self._verlet(y0[0], y0[1], t[1] - t[0], y[0], y[1])
+            return t, y, collect_stats(
+                method, time.perf_counter() - start, len(t),
+                step_times=t, n_rejected=0
+            )
 
-        sol = solve_ivp(self, (0, T), y0, max_step=dt)
-        self._t = sol.t
-        self._theta, self._omega = sol.y[0], sol.y[1]
+        fun = RhsTimer(self) if profile else self
+        sol = solve_ivp(
+            fun, (t0, T), y0, events=events,
+            **ivp_options(T, dt, method, dense, rtol, atol, self.jacobian, t0)
+        )
+        if events is not None:
+            self.t_events, self.y_events = sol.t_events, sol.y_events
+        return sol.t, sol.y, collect_stats(
+            method, time.perf_counter() - start, sol.nfev, sol.njev, sol.nlu,
+            step_times=None if dense else sol.t,
+            rhs_time=fun.time if profile else None,
+        )
+
+    def iter_solve(self, y0, T, dt, chunk=10000, angle="rad", method="RK45",
+                   rtol=None, atol=None):
+        """
+        Generator som løser ODE-systemet bit for bit i stedet for å holde
+        hele løsningen i minnet. Gir tupler (t, theta, omega) med chunk
+        punkter hver på et uniformt tidsgrid med avstand dt, og løseren
+        beholder tilstanden sin mellom bitene. Nøyaktigheten styres av rtol
+        og atol som i solve med dense=True, og method="verlet" bruker den
+        innebygde Verlet-metoden.
+        """
+        y0 = np.array(y0, dtype=float)
+        if angle == "deg":
+            y0[0] = np.radians(y0[0])
+
+        if method == "verlet":
+            chunks = iter_fixed_step(
+                lambda y, h, out: self._verlet(y[0], y[1], h, out[0], out[1]),
+                y0, T, dt, chunk
+            )
+        else:
+            chunks = iter_grid(self, y0, T, dt, chunk, method, rtol, atol,
+                               self.jacobian)
+        for t, y in chunks:
+            yield t, y[0], y[1]
+
+    def _verlet(self, theta, omega, h, out_theta, out_omega):
+        """
+        Velocity-Verlet med fast steg h. Startverdiene theta og omega legges
+        i out_theta[0] og out_omega[0], og resten av de ferdig allokerte
+        arrayene fylles steg for steg uten nye allokeringer. Et eventuelt
+        dempeledd B/M behandles implisitt, så metoden er eksplisitt i
+        vinkelen og stabil for alle B. Returnerer den siste tilstanden.
+        """
+        k = self.g / self.L
+        c = self._B / self.M
+        sin = math.sin
+        theta, omega = float(theta), float(omega)
+        acc = -k * sin(theta) - c * omega
+        out_theta[0], out_omega[0] = theta, omega
+        for i in range(1, len(out_theta)):
+            omega_half = omega + h / 2 * acc
+            theta = theta + h * omega_half
+            omega = (omega_half - h / 2 * k * sin(theta)) / (1 + h / 2 * c)
+            acc = -k * sin(theta) - c * omega
+            out_theta[i], out_omega[i] = theta, omega
+        return theta, omega
+
+    def _set_solution(self, t, y):
+        """Lagrer en ny løsning og sletter de mellomlagrede størrelsene."""
+        self.clear_cache()
+        self._buffer = None
+        self._cache_buffers = {}
+        self._last_state = None
+        self._set_arrays(t, y)
+
+    def _set_arrays(self, t, y):
+        """Setter arrayene som t, theta og omega returnerer."""
+        self._t = t
+        self._theta = y[0]
+        self._omega = y[1] if len(y) > 1 else None
         self._solved = True
 
+    def _solution_arrays(self):
+        """
+        Returnerer t og tilstandene i samme rekkefølge som _columns. Er
+        omega ikke lagret, er den heller ikke med her.
+        """
+        if self._omega is None:
+            return [self.t, self.theta]
+        return [self.t, self.theta, self.omega]
+
+    def _parameters(self):
+        """Returnerer parameterne som trengs for å lage modellen på nytt."""
+        return {"L": self.L, "M": self.M, "g": self.g}
+
+    def clear_cache(self):
+        """
+        Sletter de mellomlagrede avledede størrelsene (x, y, vx, vy,
+        potential og kinetic). De regnes ut på nytt neste gang de hentes, så
+        metoden kan brukes for å frigjøre minne.
+        """
+        clear_cached_properties(self)
+
+    def memory_footprint(self):
+        """
+        Antall byte brukt av løsningen og de mellomlagrede størrelsene, som
+        en dict med nøklene solution, cache og total.
+        """
+        return memory_footprint(self)
+
 # Oppgave 2d)
     @property
     def t(self):
@@ -76,9 +271,14 @@ class Pendulum:
     def omega(self):
         """
         Lagrer omega som en privat attributt og kaster en AssertionError om man 
-        prøver å hente den før metoden solve blir kalt på.
+        prøver å hente den før metoden solve blir kalt på. Er løsningen
+        lagret med keep_omega=False, kastes en AttributeError.
         """
         if self._solved:
+            if self._omega is None:
+                raise AttributeError(
+                    "omega was not stored. Solve with keep_omega=True."
+                )
             return self._omega
         else:
             raise AssertionError(
@@ -86,7 +286,7 @@ class Pendulum:
             )
 
 # Oppgave 2f)
-    @property
+    @cached_property
     def x(self):
         """
         Returnerer en array av horisontale verdier i kartetiske koordinater.
@@ -94,7 +294,7 @@ class Pendulum:
         """
         return self.L * np.sin(self.theta)
 
-    @property
+    @cached_property
     def y(self):
         """
         Returnerer en array av vertikale verdier i kartetiske koordinater.
@@ -103,26 +303,122 @@ class Pendulum:
         return -(self.L * np.cos(self.theta))
 
 # Oppgave 2g)
-    @property
+    @cached_property
     def potential(self):
         """Beregner potensiell energi."""
         return self.M * self.g * (self.y + self.L)
 
-    @property
+    @cached_property
     def vx(self):
         """Farten, v_x, til x-verdiene i pendulumen."""
         return np.gradient(self.x, self.t)
 
-    @property
+    @cached_property
     def vy(self):
         """Farten, v_y, til y-verdiene i pendulumen."""
         return np.gradient(self.y, self.t)
 
-    @property
+    @cached_property
     def kinetic(self):
         """Beregner kinetisk energi."""
         return (1 / 2) * self.M * (self.vx ** 2 + self.vy ** 2)
 
+    def state_energy(self, state):
+        """
+        Den totale energien regnet ut analytisk fra tilstanden
+        (theta, omega), M (L^2 omega^2 / 2 + g L (1 - cos theta)). state kan
+        ha flere akser etter de to variablene.
+        """
+        theta, omega = state[0], state[1]
+        return self.M * (self.L ** 2 * omega ** 2 / 2
+                         + self.g * self.L * (1 - np.cos(theta)))
+
+    def analytic_period(self, amplitude):
+        """
+        Den eksakte perioden til en udempet pendel som slippes fra ro med
+        vinkelutslaget amplitude, T = 4 sqrt(L/g) K(sin^2(amplitude/2)), der
+        K er det fullstendige elliptiske integralet av første type.
+        """
+        m = np.sin(np.asarray(amplitude) / 2) ** 2
+        return 4 * np.sqrt(self.L / self.g) * ellipk(m)
+
+    def periods(self, amplitudes, rtol=1e-10, atol=1e-12):
+        """
+        Måler perioden for hvert vinkelutslag i amplitudes. Pendelen slippes
+        fra ro, og integrasjonen stoppes i det første vendepunktet på den
+        andre siden, som finnes nøyaktig med hendelsesdeteksjon. Perioden
+        er to ganger denne tiden. Returnerer en tabell (dict med arrays) med
+        amplitude, målt periode, analytisk periode for en udempet pendel og
+        relativ avvik mellom dem.
+
+        Bevegelsen er symmetrisk, så et negativt utslag gir samme periode
+        som det positive. Med utslag 0 henger pendelen i ro, og den målte
+        perioden er nan (den analytiske er grensen 2 pi sqrt(L/g) for små
+        utslag).
+        """
+        amplitudes = np.asarray(amplitudes, dtype=float)
+        analytic = self.analytic_period(amplitudes)
+        measured = np.full(len(amplitudes), np.nan)
+        # Slippes pendelen fra theta > 0, minker omega først, så det første
+        # vendepunktet med økende omega er på den andre siden og ikke i t = 0
+        event = apex(direction=1, terminal=True)
+        for i, (amplitude, bound) in enumerate(zip(amplitudes, analytic)):
+            if amplitude == 0:
+                continue
+            sol = solve_ivp(self, (0, bound), (abs(amplitude), 0),
+                            events=event, rtol=rtol, atol=atol)
+            if len(sol.t_events[0]):
+                measured[i] = 2 * sol.t_events[0][0]
+        return {
+            "amplitude": amplitudes,
+            "period": measured,
+            "analytic": analytic,
+            "relative_error": (measured - analytic) / analytic,
+        }
+
+
+def zero_crossing(direction=0, terminal=False):
+    """
+    Lager en hendelse for solve som inntreffer når theta krysser null.
+    direction=1 gir bare kryssinger der theta øker, og -1 der den minker.
+    """
+    def event(t, y):
+        return y[0]
+    event.direction = direction
+    event.terminal = terminal
+    return event
+
+
+def apex(direction=0, terminal=False):
+    """
+    Lager en hendelse for solve som inntreffer i vendepunktene, der omega
+    krysser null. direction=1 gir bunnpunktene (theta minst) og -1
+    toppunktene (theta størst).
+    """
+    def event(t, y):
+        return y[1]
+    event.direction = direction
+    event.terminal = terminal
+    return event
+
+
+def amplitude_below(pendulum, threshold, terminal=True):
+    """
+    Lager en hendelse for solve som inntreffer når energien til pendelen
+    blir så lav at vinkelutslaget er mindre enn threshold. Brukes for å
+    finne tiden det tar før en dempet pendel har avtatt til et gitt utslag,
+    og stopper integrasjonen som standard.
+    """
+    k = pendulum.g / pendulum.L
+    limit = k * (1 - np.cos(threshold))
+
+    def event(t, y):
+        theta, omega = y
+        return omega ** 2 / 2 + k * (1 - np.cos(theta)) - limit
+    event.direction = -1
+    event.terminal = terminal
+    return event
+
 
 class DampenedPendulum(Pendulum):
     """
@@ -137,6 +433,10 @@ class DampenedPendulum(Pendulum):
         super().__init__(L, M, g)
         self._B = B
 
+    def _parameters(self):
+        """Returnerer parameterne som trengs for å lage modellen på nytt."""
+        return {"B": self._B, **super()._parameters()}
+
     def __call__(self, t, y):
         """
         Beregner og returnerer den deriverte av omega og deriverte av theta
@@ -148,10 +448,23 @@ class DampenedPendulum(Pendulum):
         ) - (self._B / self.M) * omega
         return theta_deriv, omega_deriv
 
+    def jacobian(self, t, y):
+        """
+        Returnerer jakobimatrisen til høyresiden, med dempeleddet -B/M på
+        diagonalen.
+        """
+        theta, omega = y
+        return np.array([
+            [0.0, 1.0],
+            [-self.g / self.L * np.cos(theta), -self._B / self.M],
+        ])
+
 
 # Oppgave 2h) og 2i) 
 if __name__ == '__main__': 
     """Tester Pendulum og DampenedPendulum klassene med plots."""
+    import matplotlib.pyplot as plt
+
     pend = Pendulum()
     #pend = DampenedPendulum(0.25)
     pend.solve((3 * np.pi / 7, 0), 10, 0.01)
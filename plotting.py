@@ -0,0 +1,163 @@
+import numpy as np
+from solver_tools import stored_columns
+
+
+def minmax_downsample(x, y, n_out):
+    """
+    Reduserer (x, y) til høyst n_out punkter ved å dele punktene i n_out/2
+    like store bøtter og beholde det minste og det største y-punktet i hver
+    bøtte, i rekkefølgen de kommer. Topper og bunner blir dermed med selv om
+    de bare varer ett punkt, og plottet ser likt ut når det er én bøtte per
+    piksel. Første og siste punkt beholdes alltid. Returnerer (x, y).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(y)
+    if n <= n_out:
+        return x, y
+    buckets = max((n_out - 2) // 2, 1)
+    size = -(-(n - 2) // buckets)
+    inner = y[1:n - 1]
+    # Fyller ut den siste bøtten med den siste verdien
+    padded = np.pad(inner, (0, buckets * size - len(inner)), mode="edge")
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size + 1
+    lo = np.minimum(padded.argmin(axis=1) + offsets, n - 2)
+    hi = np.minimum(padded.argmax(axis=1) + offsets, n - 2)
+    index = np.sort(np.column_stack((lo, hi)), axis=1).ravel()
+    index = np.unique(np.concatenate(([0], index, [n - 1])))
+    return x[index], y[index]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: reduserer (x, y) til n_out punkter ved
+    å dele de indre punktene i n_out - 2 bøtter etter rekkefølge, og velge
+    punktet i hver bøtte som gir den største trekanten med det forrige
+    valgte punktet og gjennomsnittet av neste bøtte. Bevarer formen på
+    kurven bedre enn å ta hvert k-te punkt, og virker også når x ikke er
+    monoton (for eksempel i et faseplott). Returnerer (x, y).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    index = np.empty(n_out, dtype=int)
+    index[0], index[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i < n_out - 3:
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        a = start + int(area.argmax())
+        index[i + 1] = a
+    return x[index], y[index]
+
+
+DOWNSAMPLERS = {"minmax": minmax_downsample, "lttb": lttb}
+
+
+def _axes_and_budget(ax, n_out):
+    """
+    Henter aksene (lager nye om ax er None) og antall punkter per kurve,
+    som standard to per piksel i bredden av aksene.
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.figure().add_subplot()
+    if n_out is None:
+        n_out = 2 * int(np.ceil(ax.get_window_extent().width))
+    return ax, n_out
+
+
+def plot_series(ax, x, y, n_out, method="minmax", **kwargs):
+    """Nedsampler (x, y) til n_out punkter og plotter dem på ax."""
+    x, y = DOWNSAMPLERS[method](x, y, n_out)
+    return ax.plot(x, y, **kwargs)[0]
+
+
+def plot_energy(model, ax=None, n_out=None, method="minmax"):
+    """
+    Plotter potensiell, kinetisk og total energi mot tiden for en løst
+    modell, nedsamplet til pikselbudsjettet n_out (standard to punkter per
+    piksel i bredden). Returnerer aksene.
+    """
+    ax, n_out = _axes_and_budget(ax, n_out)
+    t, potential, kinetic = model.t, model.potential, model.kinetic
+    plot_series(ax, t, potential, n_out, method, label="potential energy")
+    plot_series(ax, t, kinetic, n_out, method, label="kinetic energy")
+    plot_series(ax, t, kinetic + potential, n_out, method,
+                label="kinetic + potential")
+    ax.set_xlabel("t")
+    ax.legend()
+    return ax
+
+
+def _named_arrays(model, prefix):
+    """Par (navn, array) for de lagrede kolonnene som starter med prefix."""
+    columns = stored_columns(model)
+    return [(name, array)
+            for name, array in zip(columns, model._solution_arrays())
+            if name.startswith(prefix)]
+
+
+def plot_angles(model, ax=None, n_out=None, method="minmax"):
+    """Plotter alle vinklene mot tiden, nedsamplet som i plot_energy."""
+    ax, n_out = _axes_and_budget(ax, n_out)
+    for name, theta in _named_arrays(model, "theta"):
+        plot_series(ax, model.t, theta, n_out, method, label=name)
+    ax.set_xlabel("t")
+    ax.legend()
+    return ax
+
+
+def plot_phase(model, ax=None, n_out=None):
+    """
+    Plotter faseportrettet (theta mot omega) for hver pendel. Kurven er
+    ikke en funksjon av theta, så den nedsamples med LTTB etter tiden.
+    Krever at omega er lagret.
+    """
+    ax, n_out = _axes_and_budget(ax, n_out)
+    omegas = _named_arrays(model, "omega")
+    if not omegas:
+        raise AttributeError("omega was not stored. Solve with "
+                             "keep_omega=True to plot the phase portrait.")
+    for (name, theta), (_, omega) in zip(_named_arrays(model, "theta"),
+                                         omegas):
+        plot_series(ax, theta, omega, n_out, "lttb", label=name)
+    ax.set_xlabel("theta")
+    ax.set_ylabel("omega")
+    ax.legend()
+    return ax
+
+
+class PlotMixin:
+    """
+    Plottemetodene til de løste modellene (Pendulum, DoublePendulum og
+    NPendulum). Modellen må ha t, potential, kinetic, _solution_arrays og
+    _columns.
+    """
+    def plot_energy(self, ax=None, n_out=None, method="minmax"):
+        """
+        Plotter energiene mot tiden, nedsamplet til pikselbudsjettet med
+        min/maks-bøtter (method="minmax") eller LTTB (method="lttb"), så
+        plottet tar omtrent like lang tid uansett hvor lang løsningen er.
+        Se plot_energy.
+        """
+        return plot_energy(self, ax, n_out, method)
+
+    def plot_angles(self, ax=None, n_out=None, method="minmax"):
+        """Plotter vinklene mot tiden, nedsamplet som i plot_energy."""
+        return plot_angles(self, ax, n_out, method)
+
+    def plot_phase(self, ax=None, n_out=None):
+        """Plotter faseportrettet theta mot omega, nedsamplet med LTTB."""
+        return plot_phase(self, ax, n_out)
@@ -0,0 +1,188 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from solver_tools import storage_policy, stored_index, time_grid
+
+# Layout i delt minne:
+#   Blokken inneholder bare én sammenhengende array i C-rekkefølge, som
+#   starter på byte 0 og har formen og typen fra SharedResults (ingen
+#   header). For solve_trajectories er formen (baner, variabler, punkter),
+#   der variablene er de lagrede kolonnene (stored_columns) uten t, og
+#   punktene er de som lagres av tidsgridet time_grid(T, dt) med every.
+#   Typen er dtype fra lagringsreglene. For run_sweep er
+#   formen (punkter i gridet, *formen til resultatet fra reduce).
+#   Arbeidsprosessene får bare navnet, formen og typen (spec), og skriver
+#   direkte i sin rad.
+
+
+class _SharedMemory(shared_memory.SharedMemory):
+    """
+    SharedMemory som ikke klager når den slettes mens det fortsatt finnes
+    views av arrayen. Da holder viewene selve minnet, som frigjøres sammen
+    med det siste av dem.
+    """
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def _view(shm, shape, dtype):
+    """
+    Lager arrayen i blokken. np.frombuffer holder på bufferen, så blokken
+    kan ikke lukkes (og minnet forsvinne) så lenge arrayen eller views av
+    den finnes.
+    """
+    count = int(np.prod(shape))
+    return np.frombuffer(shm.buf, dtype, count).reshape(shape)
+
+
+def _release(shm):
+    """
+    Lukker og sletter en delt minneblokk. Finnes det fortsatt views av
+    blokken, kan den ikke lukkes, men navnet slettes likevel, så minnet
+    frigjøres når det siste viewet forsvinner.
+    """
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedResults:
+    """
+    En array med formen shape som ligger i en multiprocessing.shared_memory
+    blokk, slik at arbeidsprosesser kan skrive resultatene sine rett inn i
+    den i stedet for å sende dem tilbake. Foreldreprosessen eier blokken og
+    ser den som en vanlig NumPy-array i array.
+
+    Brukes helst som en kontekstbehandler, som sletter blokken til slutt:
+
+        with SharedResults((100, 4, 1001)) as results:
+            solve_trajectories(model, Y0, T, dt, results)
+            final = results.array[:, :, -1].copy()
+
+    array og views av den må ikke brukes etter at blokken er lukket, så
+    det som skal beholdes må kopieres ut først. Glemmer man å lukke den,
+    slettes blokken når objektet blir borte.
+    """
+    def __init__(self, shape, dtype=np.float64):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = _SharedMemory(create=True, size=max(nbytes, 1))
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+        self.array = _view(self._shm, self.shape, self.dtype)
+
+    @property
+    def name(self):
+        """Navnet på blokken i delt minne."""
+        return self._shm.name
+
+    @property
+    def spec(self):
+        """
+        Det en arbeidsprosess trenger for å finne arrayen, som (navn, form,
+        type).
+        """
+        return self.name, self.shape, self.dtype.str
+
+    @property
+    def closed(self):
+        """Om blokken er lukket og slettet."""
+        return not self._finalizer.alive
+
+    def close(self):
+        """Fjerner arrayen og lukker og sletter blokken."""
+        self.array = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Blokkene en arbeidsprosess har åpnet, så de bare åpnes én gang per prosess
+_attached = {}
+
+
+def attach(spec):
+    """
+    Åpner en blokk fra SharedResults.spec i en arbeidsprosess og returnerer
+    arrayen. Blokken holdes åpen til prosessen avslutter, og slettes aldri
+    herfra, det gjør eieren.
+    """
+    name, shape, dtype = spec
+    if name not in _attached:
+        shm = _SharedMemory(name=name)
+        _attached[name] = (shm, _view(shm, shape, dtype))
+    return _attached[name][1]
+
+
+def _solve_into(task):
+    """Løser én bane og skriver den inn i raden sin i den delte arrayen."""
+    model, target, k, y0, T, dt, solve_kwargs = task
+    array = attach(target) if isinstance(target, tuple) else target
+    model.solve(list(y0), T, dt, **solve_kwargs)
+    array[k] = model._solution_arrays()[1:]
+
+
+def solve_trajectories(model, Y0, T, dt, results=None, processes=None,
+                       chunksize=None, **solve_kwargs):
+    """
+    Løser modellen for hver startbetingelse i Y0 (form (baner, variabler))
+    fordelt på en prosesspool, og skriver banene rett inn i en SharedResults
+    med formen (baner, variabler, punkter) uten å sende dem tilbake
+    mellom prosessene. Banene ligger på tidsgridet time_grid(T, dt), så
+    solve kalles med dense=True (metodene med fast steg bruker det samme
+    gridet), og dense=False gir ValueError. Lagringsreglene dtype, every
+    og keep_omega virker som i solve og bestemmer typen, antall punkter og
+    variablene i blokken. Gis ikke results, lages en ny blokk, som den som
+    kaller må lukke. Returnerer (t, results).
+
+    processes og chunksize virker som i parameter_sweep.run_sweep, og
+    resten av nøkkelordargumentene sendes videre til solve.
+    """
+    Y0 = np.array(Y0, dtype=float, ndmin=2)
+    if not solve_kwargs.setdefault("dense", True):
+        raise ValueError("solve_trajectories needs dense=True so that all "
+                         "trajectories share one time grid")
+    policy = storage_policy(solve_kwargs.get("dtype", np.float64),
+                            solve_kwargs.get("every", 1),
+                            solve_kwargs.get("keep_omega", True))
+    t = time_grid(T, dt)
+    t = t[stored_index(len(t), policy["every"])]
+    n_variables = len(model._columns) - 1
+    if not policy["keep_omega"]:
+        n_variables = len(model._angle_rows)
+    shape = (len(Y0), n_variables, len(t))
+    if results is None:
+        results = SharedResults(shape, policy["dtype"])
+    elif results.shape != shape:
+        raise ValueError(f"results must have shape {shape}")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        for k, y0 in enumerate(Y0):
+            _solve_into((model, results.array, k, y0, T, dt, solve_kwargs))
+        return t, results
+
+    tasks = [(model, results.spec, k, y0, T, dt, solve_kwargs)
+             for k, y0 in enumerate(Y0)]
+    if chunksize is None:
+        chunksize = max(len(tasks) // (4 * processes), 1)
+    with ProcessPoolExecutor(processes) as pool:
+        for _ in pool.map(_solve_into, tasks, chunksize=chunksize):
+            pass
+    return t, results
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+from trajectory_store import load_trajectory, save_trajectory
+
+
+# Det solve lagrer i modellen ved siden av løsningen
+_RESULT_ATTRIBUTES = ("solve_stats", "nfev", "t_events", "y_events")
+
+
+def _describe(value):
+    """
+    Beskriver en verdi som json ikke kan lagre direkte, slik at den gir den
+    samme nøkkelen hver gang og i alle prosesser. Funksjoner (for eksempel
+    hendelser) beskrives med modul, navn, bytekode, direction, terminal og
+    verdiene de har med seg fra omgivelsene, i stedet for med repr, som
+    inneholder minneadressen. Andre verdier gir TypeError.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.dtype):
+        return value.name
+    if hasattr(value, "_parameters") and not isinstance(value, type):
+        return {"model": type(value).__name__,
+                "parameters": value._parameters()}
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        return {
+            "function": f"{value.__module__}.{value.__qualname__}",
+            "code": code.co_code.hex(),
+            "constants": [c for c in code.co_consts
+                          if isinstance(c, (int, float, str, type(None)))],
+            "direction": getattr(value, "direction", None),
+            "terminal": getattr(value, "terminal", None),
+            "closure": [cell.cell_contents
+                        for cell in value.__closure__ or ()],
+        }
+    raise TypeError(f"Cannot build a cache key from {value!r}")
+
+
+class SolveCache:
+    """
+    Mellomlager løsninger fra solve, slik at gjentatte kall med samme
+    modell, parametere og innstillinger returnerer umiddelbart. Nøkkelen er
+    en hash av modellklassen, parameterne, y0, T, dt, vinkelenheten og
+    resten av argumentene til solve.
+
+    Cachen har to nivåer: et LRU-nivå i minnet med plass til maxsize
+    løsninger, og et valgfritt nivå på disk i mappen directory, der
+    løsningene lagres med trajectory_store. maxsize teller løsninger og
+    ikke byte, så minnebruken avhenger av hvor lange de er (se nbytes).
+    Antall treff, bom og utkastelser telles i stats.
+
+    Argumenter til solve som ikke kan beskrives entydig (se _describe) gir
+    TypeError i stedet for en nøkkel som kan kollidere.
+
+    Ved et treff får modellen også solve_stats, nfev og eventuelt t_events
+    og y_events fra løsningen i cachen. Løsninger fra disk har ikke disse,
+    så da fjernes de fra modellen i stedet for å bli stående fra forrige
+    kall.
+    """
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._memory = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def nbytes(self):
+        """Antall byte som løsningene i minnenivået bruker."""
+        return sum(t.nbytes + y.nbytes for t, y, *_ in self._memory.values())
+
+    def key(self, model, y0, T, dt, angle="rad", **solve_kwargs):
+        """Regner ut nøkkelen som løsningen lagres under."""
+        if "dtype" in solve_kwargs:
+            solve_kwargs["dtype"] = np.dtype(solve_kwargs["dtype"]).name
+        description = {
+            "model": type(model).__name__,
+            "parameters": model._parameters(),
+            "y0": [float(v) for v in np.ravel(y0)],
+            "T": T, "dt": dt, "angle": angle,
+            "solve": solve_kwargs,
+        }
+        encoded = json.dumps(description, sort_keys=True, default=_describe)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def solve(self, model, y0, T, dt, angle="rad", **solve_kwargs):
+        """
+        Gir modellen samme løsning som model.solve(y0, T, dt, angle,
+        **solve_kwargs), men henter den fra cachen om den finnes der.
+        Returnerer det samme som solve.
+        """
+        key = self.key(model, y0, T, dt, angle, **solve_kwargs)
+        path = self._path(key)
+        if key in self._memory:
+            self.stats["hits"] += 1
+            self._memory.move_to_end(key)
+        elif path is not None and os.path.exists(path):
+            self.stats["disk_hits"] += 1
+            stored = load_trajectory(path)
+            self._insert(key, stored._solution_arrays(), stored._solve_info,
+                         {})
+        else:
+            self.stats["misses"] += 1
+            if angle != "rad":
+                solve_kwargs["angle"] = angle
+            # solve gjør om grader til radianer i y0, så den får en kopi
+            y0 = list(y0) if np.ndim(y0) else y0
+            result = model.solve(y0, T, dt, **solve_kwargs)
+            names = _RESULT_ATTRIBUTES
+            if solve_kwargs.get("events") is None:
+                names = names[:2]
+            results = {name: getattr(model, name) for name in names
+                       if hasattr(model, name)}
+            self._insert(key, model._solution_arrays(), model._solve_info,
+                         results)
+            if path is not None:
+                save_trajectory(model, path)
+            return result
+
+        t, y, info, results = self._memory[key]
+        # extend endrer _solve_info, så modellen får en egen kopi
+        model._solve_info = dict(info)
+        for name in _RESULT_ATTRIBUTES:
+            if name in results:
+                setattr(model, name, results[name])
+            else:
+                model.__dict__.pop(name, None)
+        return model._set_solution(t, y)
+
+    def clear(self):
+        """Tømmer minnenivået. Løsningene på disk beholdes."""
+        self._memory.clear()
+
+    def _insert(self, key, arrays, info, results):
+        """
+        Legger en kopi av løsningen i minnenivået, sammen med innstillingene
+        og det solve ellers lagret i modellen (results), og kaster ut de
+        eldste løsningene om det blir fullt.
+        """
+        t, y = np.array(arrays[0]), np.array(arrays[1:])
+        t.flags.writeable = False
+        y.flags.writeable = False
+        self._memory[key] = (t, y, dict(info), results)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _path(self, key):
+        """Filen der løsningen med denne nøkkelen lagres på disk."""
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key + ".traj")
@@ -0,0 +1,409 @@
+import copy
+import time
+from functools import cached_property
+
+import numpy as np
+from scipy import integrate
+
+
+def time_grid(T, dt, t0=0):
+    """
+    Lager et uniformt tidsgrid fra t0 til T. Antall steg rundes av til
+    nærmeste heltall, slik at siste punkt alltid er nøyaktig T og steglengden
+    blir (T - t0)/n (lik dt når T - t0 er et heltallig multiplum av dt).
+    """
+    n = max(int(round((T - t0) / dt)), 1)
+    return np.linspace(t0, T, n + 1)
+
+
+def cached_property_names(obj):
+    """Navnene på alle functools.cached_property i klassen til objektet."""
+    return [name for cls in type(obj).__mro__
+            for name, attr in vars(cls).items()
+            if isinstance(attr, cached_property)]
+
+
+def clear_cached_properties(obj):
+    """
+    Fjerner alle verdier som er lagret av functools.cached_property på
+    objektet, slik at de regnes ut på nytt neste gang de hentes.
+    """
+    for name in cached_property_names(obj):
+        obj.__dict__.pop(name, None)
+
+
+# Metoder i solve_ivp som bruker jakobimatrisen
+IMPLICIT_METHODS = ("Radau", "BDF", "LSODA")
+
+# Standard nøyaktighetskrav når løseren får velge steglengden selv
+DENSE_RTOL = 1e-6
+DENSE_ATOL = 1e-9
+
+
+def solve_info(y0, T, dt, method, dense=False, rtol=None, atol=None,
+               storage=None):
+    """
+    Samler innstillingene som ble brukt i et kall på solve, slik at
+    løsningen kan beskrives (og lagres) sammen med parameterne til modellen.
+    storage er lagringsreglene fra storage_policy.
+    """
+    return {
+        "y0": [float(v) for v in y0], "T": T, "dt": dt, "method": method,
+        "dense": dense, "rtol": rtol, "atol": atol, "storage": storage,
+    }
+
+
+def storage_policy(dtype=np.float64, every=1, keep_omega=True):
+    """
+    Lager lagringsreglene for en løsning: tilstandene lagres med typen
+    dtype (float32 eller float64), bare hvert every-te punkt beholdes, og
+    med keep_omega=False lagres bare vinklene. t lagres alltid som float64,
+    siden float32 ikke har nok siffer til tidspunktene i lange løsninger.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind != "f":
+        raise ValueError("dtype must be a floating point type")
+    if every < 1 or int(every) != every:
+        raise ValueError("every must be a positive integer")
+    return {"dtype": dtype.name, "every": int(every),
+            "keep_omega": bool(keep_omega)}
+
+
+def store_solution(model, t, y, first=0):
+    """
+    Reduserer en løsning (t, y) fra integrasjonen etter lagringsreglene i
+    model._solve_info, og returnerer (t, y) slik de skal lagres. Punktene
+    first, first + every, ... beholdes, og det siste punktet beholdes
+    alltid.
+    """
+    policy = model._solve_info.get("storage") or storage_policy()
+    every = policy["every"]
+    if every > 1 or first:
+        index = stored_index(len(t), every, first)
+        t, y = t[index], y[:, index]
+    if not policy["keep_omega"]:
+        y = y[list(model._angle_rows)]
+    return t, y.astype(policy["dtype"], copy=False)
+
+
+def clear_events(model):
+    """
+    Fjerner t_events og y_events fra en tidligere løsning, så de ikke blir
+    stående etter et nytt kall på solve uten hendelser.
+    """
+    model.__dict__.pop("t_events", None)
+    model.__dict__.pop("y_events", None)
+
+
+def stored_index(n, every, first=0):
+    """
+    Indeksene som beholdes av n punkter med lagringsregelen every: first,
+    first + every, ... og alltid det siste punktet.
+    """
+    index = np.arange(first, n, every)
+    if len(index) == 0 or index[-1] != n - 1:
+        index = np.append(index, n - 1)
+    return index
+
+
+def set_solution(model, t, y):
+    """
+    Lagrer en ny løsning (t, y) fra integrasjonen i modellen etter
+    lagringsreglene. _set_solution glemmer den forrige siste tilstanden,
+    så den settes etterpå, i full presisjon, slik at extend kan fortsette
+    derfra selv om omega ikke lagres.
+    """
+    model._set_solution(*store_solution(model, t, y))
+    model._last_state = _final_state(t, y)
+
+
+def _final_state(t, y):
+    """Det siste tidspunktet og den siste tilstanden i full presisjon."""
+    return float(t[-1]), np.array(y[:, -1], dtype=float)
+
+
+def stored_columns(model):
+    """Navnene på kolonnene som faktisk er lagret i løsningen."""
+    policy = (getattr(model, "_solve_info", None) or {}).get("storage")
+    if policy is None or policy["keep_omega"]:
+        return list(model._columns)
+    return [name for name in model._columns if not name.startswith("omega")]
+
+
+def memory_footprint(model):
+    """
+    Antall byte som brukes av løsningen og av de mellomlagrede avledede
+    størrelsene, som en dict med nøklene solution, cache og total. Med
+    buffere fra extend telles hele bufferen.
+    """
+    buffer = getattr(model, "_buffer", None)
+    if buffer is None:
+        buffer = model._solution_arrays()
+    solution = sum(np.asarray(array).nbytes for array in buffer)
+    buffers = getattr(model, "_cache_buffers", None) or {}
+    cache = 0
+    for name in cached_property_names(model):
+        if name in model.__dict__:
+            array = np.asarray(model.__dict__[name])
+            if buffers.get(name) is not None and array.base is buffers[name]:
+                array = buffers[name]
+            cache += array.nbytes
+    return {"solution": solution, "cache": cache, "total": solution + cache}
+
+
+def ivp_options(T, dt, method, dense=False, rtol=None, atol=None, jac=None,
+                t0=0):
+    """
+    Lager nøkkelordargumentene til solve_ivp for integrasjon fra t0 til T.
+    Som standard begrenses steglengden til dt (max_step). Med dense=True
+    velger løseren steglengden selv ut fra rtol og atol, og løsningen hentes
+    ut på et uniformt tidsgrid med avstand dt. Jakobimatrisen jac sendes
+    bare videre til metodene som bruker den.
+    """
+    options = {"method": method}
+    if jac is not None and method in IMPLICIT_METHODS:
+        options["jac"] = jac
+    if dense:
+        options["t_eval"] = time_grid(T, dt, t0)
+        options["rtol"] = DENSE_RTOL if rtol is None else rtol
+        options["atol"] = DENSE_ATOL if atol is None else atol
+        return options
+    options["max_step"] = dt
+    if rtol is not None:
+        options["rtol"] = rtol
+    if atol is not None:
+        options["atol"] = atol
+    return options
+
+
+def iter_grid(fun, y0, T, dt, chunk, method="RK45", rtol=None, atol=None,
+              jac=None):
+    """
+    Integrerer fun fra 0 til T med en av løserklassene i scipy.integrate
+    (RK45, LSODA, Radau, ...) og gir løsningen bit for bit på et uniformt
+    tidsgrid med avstand dt. Hver bit er et par (t, y) der y har form
+    (antall variabler, punkter) og inneholder chunk punkter (den siste kan
+    ha færre). Løseren beholder tilstanden sin mellom bitene, så minnebruken
+    er konstant uansett hvor lang T er.
+    """
+    n = max(int(round(T / dt)), 1)
+    h = T / n
+    options = {
+        "rtol": DENSE_RTOL if rtol is None else rtol,
+        "atol": DENSE_ATOL if atol is None else atol,
+    }
+    if jac is not None and method in IMPLICIT_METHODS:
+        options["jac"] = jac
+    solver = getattr(integrate, method)(
+        fun, 0, np.asarray(y0, dtype=float), T, **options
+    )
+
+    buf_t = np.empty(chunk)
+    buf_y = np.empty((solver.n, chunk))
+    buf_t[0], buf_y[:, 0] = 0, solver.y
+    fill, k = 1, 1
+    while k <= n:
+        if fill == chunk:
+            yield buf_t, buf_y
+            buf_t = np.empty(chunk)
+            buf_y = np.empty((solver.n, chunk))
+            fill = 0
+        if solver.status == "running" and k * h > solver.t:
+            solver.step()
+            if solver.status == "failed":
+                raise RuntimeError(solver.message)
+            continue
+
+        # Alle gridpunkter som ligger i det siste steget tas i én operasjon
+        if solver.status == "finished":
+            k_end = n + 1
+        else:
+            k_end = min(max(int(solver.t / h) + 1, k + 1), n + 1)
+        k_end = min(k_end, k + chunk - fill)
+        t_new = np.minimum(np.arange(k, k_end) * h, T)
+        buf_t[fill:fill + len(t_new)] = t_new
+        buf_y[:, fill:fill + len(t_new)] = solver.dense_output()(t_new)
+        fill += len(t_new)
+        k = k_end
+    yield buf_t[:fill], buf_y[:, :fill]
+
+
+def iter_fixed_step(kernel, y0, T, dt, chunk):
+    """
+    Som iter_grid, men for de innebygde metodene med fast steg. kernel tar
+    inn en starttilstand, steglengden og en ferdig allokert (variabler,
+    punkter) array, fyller arrayen med startverdien først, og returnerer
+    den siste tilstanden.
+    """
+    n = max(int(round(T / dt)), 1)
+    h = T / n
+    state = np.asarray(y0, dtype=float)
+    k = 0
+    while k <= n:
+        # Første bit starter i t = 0, de neste i siste punkt fra forrige bit
+        first = k == 0
+        m = min(chunk, n + 1 - k)
+        out = np.empty((len(state), m + (0 if first else 1)))
+        state = np.asarray(kernel(state, h, out), dtype=float)
+        t = np.minimum(np.arange(k, k + m) * h, T)
+        yield t, out if first else out[:, 1:]
+        k += m
+
+
+# Antall evalueringer av høyresiden per steg (også forkastede) for de
+# eksplisitte Runge-Kutta-metodene i scipy
+RK_STAGES = {"RK23": 3, "RK45": 6}
+
+
+class RhsTimer:
+    """
+    Pakker inn en høyreside og summerer tiden som brukes i den. Brukes bare
+    når statistikken skal måles eller sendes til en hook, så vanlige kall
+    på solve får ingen ekstra kostnad.
+    """
+    def __init__(self, fun):
+        self.fun = fun
+        self.time = 0.0
+
+    def __call__(self, t, y):
+        start = time.perf_counter()
+        try:
+            return self.fun(t, y)
+        finally:
+            self.time += time.perf_counter() - start
+
+
+def collect_stats(method, wall_time, nfev, njev=0, nlu=0, step_times=None,
+                  rhs_time=None, n_rejected=None, bins=20):
+    """
+    Lager statistikken fra et kall på solve som en dict. step_times er
+    tidspunktene til de aksepterte stegene, og brukes til antall steg og et
+    histogram over steglengdene (counts, edges). De er None når de ikke er
+    kjent, for eksempel når løsningen bare hentes ut på et grid med t_eval.
+    For RK23 og RK45 regnes antall forkastede steg ut fra nfev.
+    """
+    n_steps, histogram = None, None
+    if step_times is not None:
+        steps = np.diff(step_times)
+        n_steps = len(steps)
+        if np.ptp(steps) <= 1e-9 * steps.max():
+            # Fast steglengde, som bare varierer med avrundingsfeil
+            steps = np.full_like(steps, steps.mean())
+        histogram = np.histogram(steps, bins=bins)
+        if n_rejected is None and method in RK_STAGES:
+            # To kall brukes til startverdien og valg av første steg
+            attempts = (nfev - 2) // RK_STAGES[method]
+            n_rejected = max(attempts - n_steps, 0)
+    return {
+        "method": method,
+        "nfev": int(nfev),
+        "njev": int(njev),
+        "nlu": int(nlu),
+        "n_steps": n_steps,
+        "n_rejected": n_rejected,
+        "wall_time": wall_time,
+        "rhs_time": rhs_time,
+        "rhs_time_share": None if rhs_time is None else rhs_time / wall_time,
+        "step_histogram": histogram,
+    }
+
+
+def record_stats(model, stats):
+    """
+    Lagrer statistikken i model.solve_stats (og antall kall i model.nfev),
+    og sender den videre til model.stats_hook om den er satt.
+    """
+    model.solve_stats = stats
+    model.nfev = stats["nfev"]
+    if model.stats_hook is not None:
+        model.stats_hook(stats)
+
+
+def extend_solution(model, T_new):
+    """
+    Fortsetter løsningen til en løst modell fra siste tidspunkt til T_new
+    med de samme innstillingene som i solve. Den nye delen legges til i
+    buffere som vokser med minst en faktor to om gangen, så gjentatte kall
+    gir amortisert lineær kostnad, og mellomlagrede avledede størrelser
+    oppdateres bare for den nye delen.
+    """
+    info = model._solve_info
+    arrays = model._solution_arrays()
+    T_old = float(arrays[0][-1])
+    if T_new <= T_old:
+        raise ValueError("T_new must be larger than the current end time")
+
+    t_last, y_last = getattr(model, "_last_state", None) or (None, None)
+    if t_last != T_old:
+        if len(arrays) != len(model._columns):
+            raise ValueError(
+                "The solution cannot be extended since omega was not stored"
+            )
+        y_last = [float(array[-1]) for array in arrays[1:]]
+    t, y, stats = model._integrate(
+        y_last, T_old, T_new, info["dt"], info["method"], info["dense"],
+        info["rtol"], info["atol"]
+    )
+    policy = info.get("storage") or storage_policy()
+    _append_solution(model, *store_solution(model, t, y, policy["every"]))
+    model._last_state = _final_state(t, y)
+    info["T"] = T_new
+    record_stats(model, stats)
+
+
+def _append_solution(model, t_new, y_new):
+    """Legger til nye punkter bakerst i løsningen til modellen."""
+    arrays = model._solution_arrays()
+    n_old, m = len(arrays[0]), len(t_new)
+    buffer = getattr(model, "_buffer", None)
+    if buffer is None or len(buffer[0]) < n_old + m:
+        capacity = max(2 * n_old, n_old + m)
+        t_buf = np.empty(capacity, dtype=arrays[0].dtype)
+        y_buf = np.empty((len(arrays) - 1, capacity), dtype=arrays[1].dtype)
+        t_buf[:n_old] = arrays[0]
+        for row, array in zip(y_buf, arrays[1:]):
+            row[:n_old] = array
+        model._buffer = buffer = (t_buf, y_buf)
+
+    t_buf, y_buf = buffer
+    t_buf[n_old:n_old + m] = t_new
+    y_buf[:, n_old:n_old + m] = y_new
+    model._set_arrays(t_buf[:n_old + m], y_buf[:, :n_old + m])
+    _extend_cache(model, n_old)
+
+
+def _extend_cache(model, n_old):
+    """
+    Oppdaterer de mellomlagrede avledede størrelsene etter at løsningen er
+    forlenget fra n_old punkter. De nye verdiene regnes ut på et vindu som
+    starter to punkter før den gamle slutten, slik at også verdier fra
+    np.gradient i den gamle endepunktet blir riktige. Som løsningen ligger
+    verdiene i buffere som vokser med minst en faktor to, så bare den nye
+    delen skrives. Arrays hentet før extend er views av bufferen og får
+    derfor også det rettede endepunktet.
+    """
+    names = [name for name in cached_property_names(model)
+             if name in model.__dict__]
+    if not names:
+        return
+    start = max(n_old - 2, 0)
+    skip = n_old - 1 - start
+    arrays = model._solution_arrays()
+    n_new = len(arrays[0])
+    window = copy.copy(model)
+    window._set_solution(arrays[0][start:],
+                         [array[start:] for array in arrays[1:]])
+    buffers = getattr(model, "_cache_buffers", None)
+    if buffers is None:
+        buffers = model._cache_buffers = {}
+    for name in names:
+        old = model.__dict__[name]
+        buffer = buffers.get(name)
+        if (buffer is None or old.base is not buffer
+                or buffer.shape[-1] < n_new):
+            capacity = max(2 * n_old, n_new)
+            buffer = np.empty(old.shape[:-1] + (capacity,), dtype=old.dtype)
+            buffer[..., :n_old - 1] = old[..., :n_old - 1]
+            buffers[name] = buffer
+        buffer[..., n_old - 1:n_new] = getattr(window, name)[..., skip:]
+        model.__dict__[name] = buffer[..., :n_new]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from animation_export import export_animation, iter_rendered, render_frames
+from double_pendulum import DoublePendulum
+from n_pendulum import NPendulum
+
+
+@pytest.fixture
+def double_pend():
+    model = DoublePendulum()
+    model.solve([np.pi/2, 0, np.pi, 0], 0.5, 0.01)
+    return model
+
+
+def test_parallel_rendering_matches_serial(double_pend):
+    frames = double_pend.frame_coordinates(60)
+    options = dict(trail=8, segment=7, figsize=(2, 2), dpi=50)
+    serial = np.concatenate(list(iter_rendered(frames, processes=1,
+                                               **options)))
+    parallel = np.concatenate(list(iter_rendered(frames, processes=2,
+                                                 **options)))
+    assert serial.shape == (len(frames), 100, 100, 4)
+    assert np.array_equal(serial, parallel)
+
+    # Segmentene skal gi de samme bildene som å tegne alt på én gang
+    reach = 1.1 * np.abs(frames).max()
+    whole = render_frames(frames, 0, len(frames), 8, reach, (2, 2), 50)
+    assert np.array_equal(serial, whole)
+    assert not np.array_equal(serial[0], serial[-1])
+
+
+def test_export_png_sequence(tmp_path):
+    chain = NPendulum(3)
+    chain.solve([1, 0.5, 0, 0, 0, 0], 0.2, 0.01)
+    chain.export_animation(str(tmp_path / "frame_%03d.png"), fps=30,
+                           processes=1)
+    files = sorted(tmp_path.iterdir())
+    assert [f.name for f in files] == [f"frame_{i:03d}.png" for i in range(7)]
+
+
+def test_video_export_without_ffmpeg_raises(double_pend, monkeypatch, tmp_path):
+    monkeypatch.setattr("shutil.which", lambda name: None)
+    with pytest.raises(RuntimeError):
+        export_animation(double_pend, str(tmp_path / "out.mp4"), processes=1)
+
+
+@pytest.mark.parametrize("model, y0", [
+    (DoublePendulum(), [np.pi/2, 0, np.pi, 0]),
+    (NPendulum(3, L=[1, 0.5, 0.25]), [1, 0.5, 0, 0, 0, 0]),
+])
+def test_exported_frame_matches_create_animation(model, y0):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    model.solve(y0, 0.5, 0.01)
+    model.create_animation(fps=20, trail=4)
+    fig = model.animation._fig
+    # Første tegning starter animasjonen og tegner bilde 0
+    fig.canvas.draw()
+    model._next_frame(7)
+    for artist in (model.trace, model.pendulums):
+        artist.set_animated(False)
+    fig.canvas.draw()
+    expected = np.asarray(fig.canvas.buffer_rgba())
+    plt.close(fig)
+
+    frames = model.frame_coordinates(20)
+    exported = render_frames(frames, 7, 8, 4, model.animation_reach)[0]
+    assert np.array_equal(exported, expected)
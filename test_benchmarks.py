@@ -0,0 +1,25 @@
+import json
+
+from benchmarks import compare, main
+
+
+def test_compare_flags_only_slow_results():
+    baseline = {"a": {"time": 1.0}, "b": {"time": 2.0}, "c": {"time": 1.0}}
+    results = {"a": {"time": 1.1}, "b": {"time": 3.0}, "d": {"time": 9.0}}
+    assert compare(results, baseline, threshold=0.2) == [("b", 2.0, 3.0)]
+    assert compare(results, baseline, threshold=0.05) == [
+        ("a", 1.0, 1.1), ("b", 2.0, 3.0)
+    ]
+
+def test_main_saves_and_compares(tmp_path, monkeypatch):
+    import benchmarks
+    monkeypatch.setattr(benchmarks, "BENCHMARKS", [benchmarks.bench_rhs])
+    path = tmp_path / "baseline.json"
+    assert main(["--quick", "--save", str(path)]) == 0
+    baseline = json.loads(path.read_text())
+    assert "rhs/DoublePendulum" in baseline
+
+    for result in baseline.values():
+        result["time"] /= 100
+    path.write_text(json.dumps(baseline))
+    assert main(["--quick", "--compare", str(path)]) == 1
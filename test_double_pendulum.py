@@ -83,3 +83,248 @@ def test_initial_condition_zero_gives_arrays_zero():
     assert np.all(double_pend.t >= 0)
     assert double_pend.t[0] == 0
     assert double_pend.t[-1] == T
+
+
+def test_solve_ensemble_matches_single_trajectories():
+    from scipy.integrate import solve_ivp
+    Y0 = np.array([[np.pi/6, 0.15, np.pi/3, 0.15],
+                   [3*np.pi/7, 1, 3*np.pi/4, 1],
+                   [0, 0, 0, 0]])
+    double_pend = DoublePendulum()
+    ensemble = double_pend.solve_ensemble(Y0, 2, 0.01)
+
+    assert ensemble.y.shape == (3, 4, len(ensemble.t))
+    assert ensemble.t[0] == 0 and ensemble.t[-1] == 2
+    for i, y0 in enumerate(Y0):
+        sol = solve_ivp(double_pend, (0, 2), y0, t_eval=ensemble.t,
+                        rtol=1e-11, atol=1e-11)
+        assert np.allclose(ensemble.theta1[i], sol.y[0], atol=1e-4)
+        assert np.allclose(ensemble.omega1[i], sol.y[1], atol=1e-4)
+        assert np.allclose(ensemble.theta2[i], sol.y[2], atol=1e-4)
+        assert np.allclose(ensemble.omega2[i], sol.y[3], atol=1e-4)
+
+def test_solve_ensemble_rhs_matches_call():
+    double_pend = DoublePendulum(L1=1.3, L2=0.7)
+    state = np.array([[0.5, 0.25, 0.5, 0.15], [1.0, -0.3, -2.0, 0.7]]).T
+    expected = np.array(double_pend(0, state))
+    assert np.allclose(double_pend._ensemble_rhs(state), expected)
+
+def test_derived_quantities_are_cached_until_next_solve():
+    double_pend = DoublePendulum()
+    double_pend.solve((np.pi/6, 0.15, np.pi/3, 0.15), 5, 0.1)
+    x2 = double_pend.x2
+    assert double_pend.x2 is x2
+
+    double_pend.solve((3*np.pi/7, 1, 3*np.pi/4, 1), 5, 0.1)
+    assert double_pend.x2 is not x2
+    assert np.allclose(
+        double_pend.x2,
+        np.sin(double_pend.theta1) + np.sin(double_pend.theta2)
+    )
+
+    double_pend.clear_cache()
+    assert "x2" not in vars(double_pend)
+
+def test_frame_coordinates_resamples_to_fps():
+    double_pend = DoublePendulum(L1=1, L2=2)
+    double_pend.solve((np.pi/6, 0.15, np.pi/3, 0.15), 2, 0.01)
+    frames = double_pend.frame_coordinates(fps=30)
+
+    assert frames.shape == (61, 3, 2)
+    assert np.all(frames[:, 0] == 0)
+    assert np.allclose(np.hypot(*frames[:, 1].T), 1)
+    assert np.allclose(np.hypot(*(frames[:, 2] - frames[:, 1]).T), 2)
+    assert np.isclose(frames[0, 2, 0], double_pend.x2[0])
+    assert np.isclose(frames[-1, 2, 1], double_pend.y2[-1])
+
+def test_next_frame_draws_buffer_and_trail():
+    import matplotlib
+    matplotlib.use("Agg")
+    double_pend = DoublePendulum()
+    double_pend.solve((np.pi/6, 0.15, np.pi/3, 0.15), 1, 0.01)
+    double_pend.create_animation(fps=20, trail=5)
+
+    trace, pendulums = double_pend._next_frame(10)
+    assert np.array_equal(pendulums.get_xdata(), double_pend._frames[10, :, 0])
+    assert len(trace.get_xdata()) == 6
+
+def test_dense_solve_matches_reference_on_uniform_grid():
+    from scipy.integrate import solve_ivp
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(y0, 5, 0.05, dense=True, rtol=1e-9, atol=1e-11)
+    assert np.allclose(np.diff(double_pend.t), 0.05)
+
+    ref = solve_ivp(double_pend, (0, 5), y0, t_eval=double_pend.t,
+                    method="DOP853", rtol=1e-12, atol=1e-12)
+    assert np.allclose(double_pend.theta1, ref.y[0], atol=1e-6)
+    assert np.allclose(double_pend.omega2, ref.y[3], atol=1e-6)
+
+@pytest.mark.parametrize(
+    "y", [(0.5, 0.3, -1.2, 0.8), (3*np.pi/7, 1, 3*np.pi/4, 1), (0, 0, 0, 0)]
+)
+def test_jacobian_matches_finite_differences(y):
+    double_pend = DoublePendulum(L1=1.3, L2=0.7)
+    eps = 1e-6
+    numerical = np.array([
+        (np.array(double_pend(0, np.add(y, eps * e)))
+         - np.array(double_pend(0, np.subtract(y, eps * e)))) / (2 * eps)
+        for e in np.eye(4)
+    ]).T
+    assert np.allclose(double_pend.jacobian(0, y), numerical, atol=1e-7)
+
+def test_radau_solve_matches_default_solve():
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(y0, 3, 0.05, dense=True, rtol=1e-9, atol=1e-11)
+    theta1 = double_pend.theta1
+
+    double_pend.solve(y0, 3, 0.05, method="Radau", dense=True,
+                      rtol=1e-9, atol=1e-11)
+    assert np.allclose(double_pend.theta1, theta1, atol=1e-6)
+
+def test_implicit_midpoint_keeps_energy_bounded():
+    double_pend = DoublePendulum()
+    double_pend.solve((3*np.pi/7, 1, 3*np.pi/4, 1), 50, 0.002,
+                      method="midpoint")
+    assert np.allclose(np.diff(double_pend.t), 0.002)
+    theta1, omega1 = double_pend.theta1, double_pend.omega1
+    theta2, omega2 = double_pend.theta2, double_pend.omega2
+    energy = (0.5 * (2 * omega1**2 + omega2**2
+                     + 2 * omega1 * omega2 * np.cos(theta1 - theta2))
+              + 9.81 * (2 * (1 - np.cos(theta1)) + (1 - np.cos(theta2))))
+    assert np.max(np.abs(energy - energy[0])) < 1e-3 * energy[0]
+
+def test_implicit_midpoint_matches_reference_over_short_time():
+    from scipy.integrate import solve_ivp
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(y0, 2, 0.001, method="midpoint")
+    ref = solve_ivp(double_pend, (0, 2), y0, t_eval=double_pend.t,
+                    rtol=1e-10, atol=1e-12)
+    assert np.allclose(double_pend.theta1, ref.y[0], atol=1e-5)
+    assert np.allclose(double_pend.theta2, ref.y[2], atol=1e-5)
+
+@pytest.mark.parametrize("method", ["LSODA", "midpoint"])
+def test_iter_solve_chunks_match_solve(method):
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    chunks = list(double_pend.iter_solve(y0, 2, 0.01, chunk=50,
+                                         method=method))
+    assert [len(c[0]) for c in chunks] == [50] * 4 + [1]
+
+    double_pend.solve(list(y0), 2, 0.01, method=method, dense=True)
+    stacked = [np.concatenate([c[i] for c in chunks]) for i in range(5)]
+    assert np.allclose(stacked[0], double_pend.t)
+    assert np.allclose(stacked[1], double_pend.theta1, atol=1e-10)
+    assert np.allclose(stacked[4], double_pend.omega2, atol=1e-10)
+
+def test_flip_times_matches_ensemble_scan():
+    double_pend = DoublePendulum()
+    theta1 = np.linspace(-3, 3, 7)
+    theta2 = np.linspace(-3, 3, 5)
+    times = double_pend.flip_times(theta1, theta2, 5, 0.01, tile=8)
+    assert times.shape == (7, 5)
+
+    grid1, grid2 = np.meshgrid(theta1, theta2, indexing="ij")
+    Y0 = np.zeros((grid1.size, 4))
+    Y0[:, 0], Y0[:, 2] = grid1.ravel(), grid2.ravel()
+    ensemble = double_pend.solve_ensemble(Y0, 5, 0.01)
+    flipped = ((np.abs(ensemble.theta1) > np.pi)
+               | (np.abs(ensemble.theta2) > np.pi))
+    expected = np.where(flipped.any(axis=1),
+                        ensemble.t[np.argmax(flipped, axis=1)], np.nan)
+    assert np.allclose(times.ravel(), expected, equal_nan=True)
+    assert np.isnan(times[3, 2])
+    assert not np.all(np.isnan(times))
+
+def test_solve_stats_for_lsoda_and_midpoint():
+    double_pend = DoublePendulum()
+    double_pend.solve((np.pi/6, 0.15, np.pi/3, 0.15), 2, 0.05, profile=True)
+    stats = double_pend.solve_stats
+    assert stats["method"] == "LSODA"
+    assert stats["n_steps"] == len(double_pend.t) - 1
+    assert stats["rhs_time"] > 0
+
+    double_pend.solve((np.pi/6, 0.15, np.pi/3, 0.15), 2, 0.05,
+                      method="midpoint")
+    assert double_pend.solve_stats["nfev"] == double_pend.nfev >= 40
+
+@pytest.mark.parametrize("method", ["LSODA", "midpoint"])
+def test_extend_matches_single_solve(method):
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(list(y0), 2, 0.01, method=method, dense=True)
+    potential = double_pend.potential
+    double_pend.extend(3)
+
+    reference = DoublePendulum()
+    reference.solve(list(y0), 3, 0.01, method=method, dense=True)
+    assert np.allclose(double_pend.t, reference.t)
+    assert np.allclose(double_pend.theta2, reference.theta2, atol=1e-5)
+    assert np.allclose(double_pend.potential, reference.potential,
+                       atol=1e-4)
+    assert len(double_pend.potential) > len(potential)
+
+def test_poincare_section_points_lie_on_section():
+    double_pend = DoublePendulum()
+    Y0 = [(0.1, 0, 0.2, 0), (1, 0, 1, 0)]
+    sections = double_pend.poincare_section(Y0, 50, processes=1)
+    assert len(sections) == 2
+    for points in sections:
+        assert points.ndim == 2 and points.shape[1] == 2
+        assert len(points) > 5
+        assert np.all(np.abs(points[:, 0]) <= np.pi)
+
+    # Kryssingene skal være de samme som med events i solve
+    double_pend.solve(list(Y0[1]), 50, 0.01, method="DOP853",
+                      rtol=1e-9, atol=1e-9,
+                      events=lambda t, y: np.sin(y[0]))
+    crossings = double_pend.y_events[0]
+    crossings = crossings[(crossings[:, 1] > 0)
+                          & (np.cos(crossings[:, 0]) > 0)]
+    assert np.allclose(sections[1][:, 1], crossings[:, 3], atol=1e-6)
+
+
+def test_poincare_section_parallel_matches_serial():
+    double_pend = DoublePendulum()
+    Y0 = np.array([(0.5, 0, 0.5, 0), (1, 0, 1, 0), (1.5, 0, 0.5, 0)])
+    serial = double_pend.poincare_section(Y0, 20, processes=1)
+    parallel = double_pend.poincare_section(Y0, 20, processes=2)
+    for a, b in zip(serial, parallel):
+        assert np.array_equal(a, b)
+
+def test_storage_policy_reduces_memory_footprint():
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    full = DoublePendulum()
+    full.solve(list(y0), 5, 0.001)
+    compact = DoublePendulum()
+    compact.solve(list(y0), 5, 0.001, dtype=np.float32, every=4,
+                  keep_omega=False)
+
+    assert compact.theta1.dtype == np.float32
+    assert compact.t.dtype == np.float64
+    assert compact.t[-1] == full.t[-1]
+    assert np.allclose(compact.theta2[:-1], full.theta2[::4], atol=1e-6)
+    with pytest.raises(AttributeError):
+        compact.omega1
+    assert (full.memory_footprint()["solution"]
+            > 8 * compact.memory_footprint()["solution"])
+
+    compact.potential
+    footprint = compact.memory_footprint()
+    assert footprint["cache"] == compact.potential.nbytes + compact.y1.nbytes \
+        + compact.y2.nbytes
+    assert footprint["total"] == footprint["solution"] + footprint["cache"]
+
+
+def test_extend_without_stored_omega():
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(list(y0), 2, 0.01, dense=True, every=2,
+                      keep_omega=False)
+    double_pend.extend(3)
+    reference = DoublePendulum()
+    reference.solve(list(y0), 3, 0.01, dense=True)
+    assert np.allclose(double_pend.t, reference.t[::2])
+    assert np.allclose(double_pend.theta1, reference.theta1[::2], atol=1e-5)
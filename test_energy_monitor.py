@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum
+from energy_monitor import EnergyDriftExceeded, EnergyMonitor
+from n_pendulum import NPendulum
+from pendulum import Pendulum
+
+
+@pytest.mark.parametrize(
+    "model, y0",
+    [
+        (Pendulum(L=2, M=3), (np.pi/4, 0.5)),
+        (DoublePendulum(L1=1.2, L2=0.8), (1, 0.3, 2, -0.5)),
+        (NPendulum(3, L=[1, 0.5, 0.7], M=[1, 2, 0.5]),
+         (0.5, -0.3, 1, 0.2, 0, -0.4)),
+    ],
+)
+def test_state_energy_matches_kinetic_plus_potential(model, y0):
+    model.solve(list(y0), 1, 0.0005, method="DOP853", dense=True, rtol=1e-12,
+                atol=1e-12)
+    state = np.vstack(model._solution_arrays()[1:])
+    energy = model.state_energy(state)
+    reference = model.kinetic + model.potential
+    assert np.allclose(energy[1:-1], reference[1:-1], rtol=1e-4)
+    assert np.ptp(energy) < 1e-8 * energy[0]
+
+
+def test_online_statistics_match_batch_statistics():
+    pend = Pendulum()
+    monitor = EnergyMonitor(pend)
+    chunks = list(pend.iter_solve([1, 0], 20, 0.01, chunk=137))
+    monitor.run(iter(chunks))
+
+    state = np.hstack([np.vstack(chunk[1:]) for chunk in chunks])
+    energy = pend.state_energy(state)
+    assert monitor.count == len(energy) == 2001
+    assert np.isclose(monitor.mean, energy.mean())
+    assert np.isclose(monitor.variance, energy.var())
+    assert monitor.min == energy.min() and monitor.max == energy.max()
+    assert np.isclose(monitor.drift,
+                      np.max(np.abs(energy - energy[0])) / energy[0])
+
+
+def test_watch_passes_chunks_through():
+    chain = NPendulum(3)
+    monitor = EnergyMonitor(chain)
+    chunks = list(monitor.watch(
+        chain.iter_solve([0.5, 0, 0, 0, 0, 0], 2, 0.01, chunk=50)
+    ))
+    assert sum(len(chunk[0]) for chunk in chunks) == monitor.count == 201
+    assert chunks[0][1].shape == (3, 50)
+
+
+def test_monitor_aborts_when_drift_is_too_large():
+    pend = Pendulum()
+    monitor = EnergyMonitor(pend, max_drift=1e-12)
+    with pytest.raises(EnergyDriftExceeded, match="at t ="):
+        monitor.run(pend.iter_solve([1, 0], 20, 0.01, method="verlet"))
+
+
+def test_ensemble_monitor_without_storing_trajectories():
+    double_pend = DoublePendulum()
+    Y0 = np.random.default_rng(0).normal(size=(5, 4))
+    stored = EnergyMonitor(double_pend)
+    ensemble = double_pend.solve_ensemble(Y0, 2, 0.001, monitor=stored)
+    streamed = EnergyMonitor(double_pend)
+    final = double_pend.solve_ensemble(Y0, 2, 0.001, monitor=streamed,
+                                       store=False, chunk=100)
+
+    assert final.y.shape == (5, 4, 2)
+    assert np.allclose(final.y[:, :, -1], ensemble.y[:, :, -1])
+    assert streamed.count == stored.count == 2001
+    assert np.allclose(streamed.mean, stored.mean)
+    assert np.allclose(streamed.drift, stored.drift)
+    assert np.all(streamed.drift < 1e-6)
+
+@pytest.mark.parametrize("store", [True, False])
+def test_ensemble_monitor_stops_early(store):
+    double_pend = DoublePendulum()
+    Y0 = np.random.default_rng(1).normal(size=(3, 4))
+    monitor = EnergyMonitor(double_pend, max_drift=1e-12)
+    with pytest.raises(EnergyDriftExceeded):
+        double_pend.solve_ensemble(Y0, 10, 0.01, monitor=monitor,
+                                   store=store, chunk=50)
+    assert monitor.count <= 50
@@ -38,3 +38,34 @@ def test_exp_decay_solve_solutions(a, u0, T):
     expected = u0 * np.exp(-a * u[0])
     tol = 1e-14
     assert np.all(abs(u[1]-expected) < tol)
+
+@pytest.mark.parametrize(
+    "a, u0, T", [(2, 3, 4), (0.2, 6, 10), (1, 5, 20)]
+)
+def test_exact_solve_matches_solve_ivp(a, u0, T):
+    t, u = ExponentialDecay(a).solve(u0, T, 50, exact=True)
+    t_ivp, u_ivp = ExponentialDecay(a).solve(u0, T, 50)
+    assert np.array_equal(t, t_ivp)
+    assert np.allclose(u, u_ivp, rtol=1e-2, atol=1e-3)
+    assert np.allclose(u, u0 * np.exp(-a * t), rtol=1e-14)
+
+def test_solve_batch_shape_and_values():
+    a = np.array([0.1, 0.5, 2.0])
+    u0 = np.array([1.0, 4.0])
+    t, u = ExponentialDecay.solve_batch(a, u0, 10, 25)
+    assert u.shape == (3, 2, 25)
+    assert np.array_equal(t, np.linspace(0, 10, 25))
+    _, expected = ExponentialDecay(0.5).solve(4.0, 10, 25, exact=True)
+    assert np.allclose(u[1, 1], expected, rtol=1e-14)
+
+def test_solve_batch_rejects_negative_a():
+    with pytest.raises(ValueError):
+        ExponentialDecay.solve_batch([0.1, -1], [1], 10, 5)
+
+def test_solve_stats_for_exponential_decay():
+    model = ExponentialDecay(0.4)
+    model.solve(3, 10, 20)
+    assert model.solve_stats["nfev"] > 0
+    model.solve(3, 10, 20, exact=True)
+    assert model.solve_stats["method"] == "exact"
+    assert model.solve_stats["nfev"] == 0
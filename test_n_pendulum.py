@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum, ODEsNotSolve
+from n_pendulum import NPendulum
+from pendulum import Pendulum
+from trajectory_store import load_trajectory, save_trajectory
+
+
+@pytest.mark.parametrize(
+    "y", [(0, 0, 0, 0), (np.pi/6, 0.15, np.pi/3, 0.15), (2, -1, -2.5, 3)]
+)
+def test_rhs_matches_double_pendulum(y):
+    double_pend = DoublePendulum(L1=1.3, L2=0.7)
+    chain = NPendulum(2, L=[1.3, 0.7])
+    theta1, omega1, theta2, omega2 = y
+    expected = double_pend(0, y)
+    derivatives = chain(0, np.array([theta1, theta2, omega1, omega2]))
+    assert np.allclose(derivatives[[0, 2, 1, 3]], expected)
+
+
+def test_single_link_matches_pendulum():
+    pend = Pendulum(L=2)
+    chain = NPendulum(1, L=2)
+    assert np.allclose(chain(0, np.array([0.3, 0.5])), pend(0, (0.3, 0.5)))
+
+
+def test_solve_matches_double_pendulum():
+    y0 = (np.pi/6, 0.15, np.pi/3, 0.15)
+    double_pend = DoublePendulum()
+    double_pend.solve(list(y0), 5, 0.01, dense=True)
+    chain = NPendulum(2)
+    chain.solve([y0[0], y0[2], y0[1], y0[3]], 5, 0.01, dense=True)
+    assert np.allclose(chain.t, double_pend.t)
+    assert np.allclose(chain.theta[1], double_pend.theta2, atol=1e-4)
+    assert np.allclose(chain.x[1], double_pend.x2, atol=1e-4)
+    assert np.allclose(chain.potential, double_pend.potential, atol=1e-3)
+    assert np.allclose(chain.kinetic, double_pend.kinetic, atol=1e-3)
+
+
+def test_energy_is_conserved_for_long_chain():
+    chain = NPendulum(6, L=[1, 0.5, 0.8, 1, 0.3, 0.6], M=[1, 2, 1, 0.5, 1, 1])
+    chain.solve([0.5] * 6 + [0] * 6, 3, 0.0005, method="DOP853",
+                rtol=1e-10, atol=1e-10)
+    energy = chain.kinetic + chain.potential
+    assert chain.theta.shape == chain.x.shape == (6, len(chain.t))
+    assert np.max(np.abs(energy - energy[0])) < 1e-3 * energy[0]
+
+
+def test_calling_solution_before_solve_raises():
+    chain = NPendulum(4)
+    with pytest.raises(ODEsNotSolve):
+        chain.theta
+    with pytest.raises(ODEsNotSolve):
+        chain.t
+
+
+def test_frame_coordinates_cover_all_links():
+    chain = NPendulum(3, L=[1, 2, 3])
+    chain.solve([0] * 6, 1, 0.01)
+    frames = chain.frame_coordinates(fps=30)
+    assert frames.shape == (31, 4, 2)
+    assert np.allclose(frames[:, :, 0], 0)
+    assert np.allclose(frames[0, :, 1], [0, -1, -3, -6])
+
+
+def test_extend_and_save_chain(tmp_path):
+    y0 = [0.4, -0.2, 0.1, 0, 0.3, 0]
+    chain = NPendulum(3)
+    chain.solve(y0, 1, 0.01, dense=True)
+    chain.potential
+    chain.extend(2)
+    reference = NPendulum(3)
+    reference.solve(y0, 2, 0.01, dense=True)
+    assert np.allclose(chain.theta, reference.theta, atol=1e-5)
+    assert np.allclose(chain.potential, reference.potential, atol=1e-4)
+
+    path = tmp_path / "chain.traj"
+    save_trajectory(chain, path)
+    loaded = load_trajectory(path)
+    assert loaded.N == 3
+    assert np.array_equal(loaded.omega, chain.omega)
@@ -0,0 +1,42 @@
+import numpy as np
+from double_pendulum import DoublePendulum
+from exp_decay import ExponentialDecay
+from pendulum import Pendulum, DampenedPendulum
+from parameter_sweep import max_energy_drift, parameter_grid, run_sweep
+
+
+def test_parameter_grid_order():
+    grid = parameter_grid(L=[1, 2], B=[0.1, 0.2, 0.3])
+    assert len(grid) == 6
+    assert grid[0] == {"L": 1, "B": 0.1}
+    assert grid[1] == {"L": 1, "B": 0.2}
+    assert grid[-1] == {"L": 2, "B": 0.3}
+
+def test_serial_sweep_matches_direct_solve():
+    grid = parameter_grid(L=[1, 2], y0=[(0.1, 0), (0.5, 0)])
+    results = run_sweep(Pendulum, grid, None, 2, 0.05, processes=1)
+
+    pendulum = Pendulum(L=2)
+    pendulum.solve([0.5, 0], 2, 0.05)
+    assert np.allclose(results[3], (pendulum.theta[-1], pendulum.omega[-1]))
+
+def test_parallel_sweep_is_deterministic():
+    grid = parameter_grid(B=[0.1, 0.5, 1.0], L=[1, 1.5])
+    serial = run_sweep(DampenedPendulum, grid, (np.pi/4, 0), 2, 0.05,
+                       processes=1)
+    parallel = run_sweep(DampenedPendulum, grid, (np.pi/4, 0), 2, 0.05,
+                         processes=2, chunksize=2)
+    assert np.allclose(serial, parallel)
+
+def test_sweep_with_energy_reduction():
+    grid = parameter_grid(L1=[1, 2])
+    drifts = run_sweep(DoublePendulum, grid, (0.1, 0, 0.1, 0), 2, 0.01,
+                       reduce=max_energy_drift, processes=1, dense=True)
+    assert len(drifts) == 2
+    assert all(drift < 0.1 for drift in drifts)
+
+def test_sweep_with_scalar_initial_value():
+    grid = parameter_grid(a=[0.1, 0.4])
+    results = run_sweep(ExponentialDecay, grid, 2, 1, 11, processes=1)
+    assert np.allclose(np.ravel(results), 2 * np.exp(-np.array([0.1, 0.4])),
+                       rtol=1e-3)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from parareal import coarse_rk4, solve_parareal
+from pendulum import DampenedPendulum, Pendulum
+
+
+def test_coarse_rk4_converges_to_fine_solution():
+    pend = Pendulum()
+    reference = Pendulum()
+    reference.solve([1, 0], 2, 0.01, method="DOP853", dense=True, rtol=1e-12,
+                    atol=1e-12)
+    end = [reference.theta[-1], reference.omega[-1]]
+    assert np.allclose(coarse_rk4(pend, [1, 0], 0, 2, 200), end, atol=1e-6)
+
+
+@pytest.mark.parametrize("model", [Pendulum(), DampenedPendulum(0.25)])
+def test_parareal_matches_serial_solve(model):
+    stats = solve_parareal(model, [np.pi/2, 0], 50, 0.01, slices=8,
+                           processes=1, tol=1e-9)
+    reference = type(model)(**model._parameters())
+    reference.solve([np.pi/2, 0], 50, 0.01, method="DOP853", dense=True,
+                    rtol=1e-10, atol=1e-10)
+    assert np.array_equal(model.t, reference.t)
+    assert np.allclose(model.theta, reference.theta, atol=1e-6)
+    assert np.allclose(model.omega, reference.omega, atol=1e-6)
+    assert 1 <= stats["iterations"] < stats["slices"] == 8
+    assert model.solve_stats is stats
+    assert stats["converged"] and stats["final_change"] < 1e-9
+    assert stats["speedup"] > 0 and stats["ideal_speedup"] > 0
+
+
+def test_parareal_is_independent_of_processes():
+    serial, parallel = DampenedPendulum(0.25), DampenedPendulum(0.25)
+    solve_parareal(serial, [1, 0], 20, 0.01, slices=4, processes=1)
+    solve_parareal(parallel, [1, 0], 20, 0.01, slices=4, processes=2)
+    assert np.array_equal(serial.theta, parallel.theta)
+
+    serial.extend(25)
+    assert serial.t[-1] == 25
+
+
+def test_parareal_warns_when_not_converged():
+    pend = Pendulum()
+    with pytest.warns(RuntimeWarning, match="did not converge"):
+        stats = solve_parareal(pend, [np.pi/2, 0], 50, 0.01, slices=8,
+                               processes=1, max_iter=2, coarse_dt=0.5)
+    assert not stats["converged"]
+    assert stats["final_change"] > stats["tol"]
@@ -1,5 +1,8 @@
 import numpy as np
-from pendulum import Pendulum
+from scipy.integrate import solve_ivp
+from pendulum import (
+    Pendulum, DampenedPendulum, amplitude_below, apex, zero_crossing,
+)
 import pytest
 
 TOL = 1e-14
@@ -47,3 +50,247 @@ def test_initial_condition_zero_gives_arrays_zero():
     assert np.all(pendulum.t >= 0)
     assert pendulum.t[0] == 0
     assert pendulum.t[-1] == T
+
+def test_derived_quantities_are_cached_until_next_solve():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/6, 0.15), 10, 0.1)
+    x = pendulum.x
+    assert pendulum.x is x
+    assert pendulum.kinetic is pendulum.kinetic
+
+    pendulum.solve((np.pi/3, 0), 10, 0.1)
+    assert pendulum.x is not x
+    assert np.allclose(pendulum.x, pendulum.L * np.sin(pendulum.theta))
+
+    kinetic = pendulum.kinetic
+    pendulum.clear_cache()
+    assert "kinetic" not in vars(pendulum)
+    assert np.array_equal(pendulum.kinetic, kinetic)
+
+def test_dense_solve_uses_uniform_grid_and_fewer_rhs_calls():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/6, 0), 10, 0.01)
+    nfev_max_step = pendulum.nfev
+
+    pendulum.solve((np.pi/6, 0), 10, 0.01, dense=True, rtol=1e-8, atol=1e-10)
+    assert np.allclose(np.diff(pendulum.t), 0.01)
+    assert pendulum.t[-1] == 10
+    assert pendulum.nfev < nfev_max_step
+
+    ref = solve_ivp(pendulum, (0, 10), (np.pi/6, 0), t_eval=pendulum.t,
+                    method="DOP853", rtol=1e-12, atol=1e-12)
+    assert np.allclose(pendulum.theta, ref.y[0], atol=1e-6)
+
+def _numerical_jacobian(f, y, eps=1e-6):
+    y = np.asarray(y, dtype=float)
+    columns = [
+        (np.array(f(0, y + eps * e)) - np.array(f(0, y - eps * e))) / (2 * eps)
+        for e in np.eye(len(y))
+    ]
+    return np.array(columns).T
+
+@pytest.mark.parametrize(
+    "pendulum", [Pendulum(L=2.7), DampenedPendulum(B=3, M=2)]
+)
+def test_jacobian_matches_finite_differences(pendulum):
+    y = (np.pi/5, -0.4)
+    assert np.allclose(pendulum.jacobian(0, y),
+                       _numerical_jacobian(pendulum, y), atol=1e-8)
+
+def test_implicit_solve_uses_analytic_jacobian():
+    pendulum = DampenedPendulum(B=500)
+    calls = []
+    jacobian = pendulum.jacobian
+    pendulum.jacobian = lambda t, y: calls.append(t) or jacobian(t, y)
+    pendulum.solve((np.pi/4, 0), 5, 0.1, method="Radau", dense=True)
+    assert calls
+    assert abs(pendulum.theta[-1]) < 1
+
+    calls.clear()
+    pendulum.solve((np.pi/4, 0), 5, 0.1, method="RK45")
+    assert not calls
+
+def test_verlet_keeps_energy_bounded():
+    pendulum = Pendulum()
+    pendulum.solve((3*np.pi/7, 0), 200, 0.002, method="verlet")
+    assert np.allclose(np.diff(pendulum.t), 0.002)
+    energy = (0.5 * pendulum.omega**2
+              + pendulum.g / pendulum.L * (1 - np.cos(pendulum.theta)))
+    assert np.max(np.abs(energy - energy[0])) < 1e-4
+
+def test_dampened_verlet_matches_reference():
+    pendulum = DampenedPendulum(B=0.5)
+    pendulum.solve((np.pi/4, 0), 10, 0.001, method="verlet")
+    ref = solve_ivp(pendulum, (0, 10), (np.pi/4, 0), t_eval=pendulum.t,
+                    rtol=1e-10, atol=1e-12)
+    assert np.allclose(pendulum.theta, ref.y[0], atol=1e-5)
+    assert np.allclose(pendulum.omega, ref.y[1], atol=1e-5)
+
+@pytest.mark.parametrize("method", ["RK45", "verlet"])
+def test_iter_solve_chunks_match_solve(method):
+    pendulum = Pendulum()
+    chunks = list(pendulum.iter_solve((np.pi/4, 0), 3, 0.01, chunk=64,
+                                      method=method))
+    assert [len(t) for t, _, _ in chunks] == [64] * 4 + [45]
+
+    pendulum.solve((np.pi/4, 0), 3, 0.01, method=method, dense=True)
+    assert np.allclose(np.concatenate([c[0] for c in chunks]), pendulum.t)
+    assert np.allclose(np.concatenate([c[1] for c in chunks]),
+                       pendulum.theta, atol=1e-10)
+    assert np.allclose(np.concatenate([c[2] for c in chunks]),
+                       pendulum.omega, atol=1e-10)
+
+def test_import_does_not_load_matplotlib():
+    import subprocess
+    import sys
+    code = ("import sys, pendulum, double_pendulum, exp_decay; "
+            "print('matplotlib' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+def test_solve_stats_are_recorded():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/6, 0), 10, 0.1)
+    stats = pendulum.solve_stats
+    assert stats["method"] == "RK45"
+    assert stats["nfev"] == pendulum.nfev > 0
+    assert stats["n_steps"] == len(pendulum.t) - 1
+    assert stats["n_rejected"] >= 0
+    assert stats["rhs_time"] is None
+    counts, edges = stats["step_histogram"]
+    assert counts.sum() == stats["n_steps"]
+
+    pendulum.solve((np.pi/6, 0), 10, 0.1, method="verlet", profile=True)
+    assert pendulum.solve_stats["n_steps"] == 100
+    assert pendulum.solve_stats["n_rejected"] == 0
+
+def test_fixed_step_histogram_with_rounding_in_steps():
+    pend = Pendulum()
+    pend.solve([0.1, 0], 1, 0.1, method="verlet")
+    counts, edges = pend.solve_stats["step_histogram"]
+    assert counts.sum() == 10
+
+def test_stats_hook_receives_profiled_stats():
+    received = []
+    pendulum = DampenedPendulum(0.5)
+    pendulum.stats_hook = received.append
+    pendulum.solve((np.pi/6, 0), 5, 0.1, method="Radau", dense=True)
+    assert received == [pendulum.solve_stats]
+    stats = received[0]
+    assert stats["njev"] > 0
+    assert stats["n_steps"] is None
+    assert 0 < stats["rhs_time_share"] < 1
+
+@pytest.mark.parametrize("method, dense", [("verlet", False), ("RK45", True)])
+def test_extend_matches_single_solve(method, dense):
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/4, 0), 3, 0.01, method=method, dense=dense)
+    x, kinetic = pendulum.x, pendulum.kinetic
+    pendulum.extend(5)
+    pendulum.extend(6)
+
+    reference = Pendulum()
+    reference.solve((np.pi/4, 0), 6, 0.01, method=method, dense=dense)
+    assert np.allclose(pendulum.t, reference.t)
+    assert np.allclose(pendulum.theta, reference.theta, atol=1e-5)
+    assert pendulum._solve_info["T"] == 6
+
+    # De mellomlagrede verdiene er oppdatert og lik en ny utregning
+    assert pendulum.__dict__["x"] is not x
+    assert np.array_equal(pendulum.x[:len(x)], x)
+    kinetic_extended = pendulum.kinetic
+    pendulum.clear_cache()
+    assert np.allclose(kinetic_extended, pendulum.kinetic)
+    assert not np.allclose(kinetic_extended[:len(kinetic)], kinetic)
+
+def test_extend_grows_buffer_geometrically():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/4, 0), 1, 0.01, method="verlet")
+    capacities = set()
+    for T in range(2, 12):
+        pendulum.extend(T)
+        capacities.add(len(pendulum._buffer[0]))
+    assert len(capacities) <= 4
+    assert len(pendulum.t) == 1101
+
+def test_extend_keeps_cached_values_in_growing_buffers():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/4, 0), 1, 0.01, method="verlet")
+    pendulum.kinetic
+    buffers = set()
+    for T in range(2, 12):
+        pendulum.extend(T)
+        buffers.add(id(pendulum._cache_buffers["kinetic"]))
+    assert len(buffers) <= 4
+    assert pendulum.kinetic.base is pendulum._cache_buffers["kinetic"]
+
+    reference = Pendulum()
+    reference.solve((np.pi/4, 0), 11, 0.01, method="verlet")
+    assert np.allclose(pendulum.kinetic, reference.kinetic)
+
+def test_extend_requires_later_time():
+    pendulum = Pendulum()
+    pendulum.solve((np.pi/4, 0), 1, 0.1)
+    with pytest.raises(ValueError):
+        pendulum.extend(1)
+
+def test_periods_for_negative_and_zero_amplitudes():
+    pendulum = Pendulum()
+    table = pendulum.periods([-1.0, 1.0, 0.0])
+    assert np.isclose(table["period"][0], table["period"][1], rtol=1e-9)
+    assert np.isclose(table["period"][0], table["analytic"][0], rtol=1e-6)
+    assert np.isnan(table["period"][2])
+    assert np.isclose(table["analytic"][2], 2 * np.pi * np.sqrt(1 / 9.81))
+
+def test_periods_match_elliptic_integral():
+    pendulum = Pendulum(L=2)
+    table = pendulum.periods([0.1, 1.0, 2.0, 3.0])
+    assert np.allclose(table["period"], table["analytic"], rtol=1e-8)
+    assert np.isclose(table["analytic"][0],
+                      2 * np.pi * np.sqrt(2 / 9.81), rtol=1e-3)
+    assert np.all(np.diff(table["period"]) > 0)
+
+def test_zero_crossing_and_apex_events():
+    pendulum = Pendulum()
+    pendulum.solve((0.2, 0), 10, 0.1,
+                   events=[zero_crossing(), apex(direction=-1)])
+    period = pendulum.periods([0.2])["period"][0]
+    crossings, tops = pendulum.t_events
+    assert np.allclose(np.diff(crossings), period / 2, rtol=1e-5)
+    assert np.allclose(np.diff(tops), period, rtol=1e-5)
+    assert np.allclose(pendulum.y_events[1][:, 0], 0.2, rtol=1e-4)
+
+def test_solve_without_events_clears_old_events():
+    pendulum = Pendulum()
+    pendulum.solve((0.2, 0), 3, 0.1, events=zero_crossing())
+    pendulum.extend(4)
+    assert len(pendulum.t_events[0]) > 0
+    pendulum.solve((0.2, 0), 3, 0.1)
+    assert not hasattr(pendulum, "t_events")
+    assert not hasattr(pendulum, "y_events")
+
+def test_amplitude_below_stops_dampened_pendulum():
+    pendulum = DampenedPendulum(B=0.5)
+    pendulum.solve((1.0, 0), 100, 0.01, events=amplitude_below(pendulum, 0.1))
+    t_stop = pendulum.t_events[0][0]
+    assert pendulum.t[-1] == t_stop < 100
+    theta, omega = pendulum.y_events[0][0]
+    amplitude = np.arccos(1 - omega**2 / (2 * 9.81) - (1 - np.cos(theta)))
+    assert np.isclose(amplitude, 0.1)
+
+def test_events_are_rejected_for_verlet():
+    with pytest.raises(ValueError):
+        Pendulum().solve((0.2, 0), 1, 0.1, method="verlet",
+                         events=zero_crossing())
+
+def test_storage_policy_for_pendulum():
+    pend = Pendulum()
+    pend.solve([np.pi/6, 0], 1, 0.01, dense=True, dtype="float32", every=3,
+               keep_omega=False)
+    assert pend.theta.dtype == np.float32
+    assert np.allclose(pend.t, np.r_[np.linspace(0, 0.99, 34), 1])
+    assert not hasattr(pend, "omega")
+    assert len(pend._solution_arrays()) == 2
+    with pytest.raises(ValueError):
+        pend.solve([np.pi/6, 0], 1, 0.01, every=0)
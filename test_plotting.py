@@ -0,0 +1,69 @@
+import matplotlib
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum
+from n_pendulum import NPendulum
+from pendulum import Pendulum
+from plotting import lttb, minmax_downsample
+
+matplotlib.use("Agg")
+
+
+def test_minmax_keeps_extremes_and_order():
+    x = np.arange(100001, dtype=float)
+    y = np.sin(x / 5000)
+    y[12345], y[67890] = 5, -5
+    xs, ys = minmax_downsample(x, y, 200)
+    assert len(xs) <= 200
+    assert np.all(np.diff(xs) > 0)
+    assert xs[0] == 0 and xs[-1] == 100000
+    assert ys.max() == 5 and ys.min() == -5
+
+
+def test_lttb_returns_budget_and_endpoints():
+    theta = np.linspace(0, 20 * np.pi, 50000)
+    x, y = np.cos(theta), np.sin(theta)
+    xs, ys = lttb(x, y, 500)
+    assert len(xs) == 500
+    assert (xs[0], ys[0]) == (x[0], y[0])
+    assert (xs[-1], ys[-1]) == (x[-1], y[-1])
+    # Punktene ligger fortsatt på sirkelen
+    assert np.allclose(xs ** 2 + ys ** 2, 1)
+
+
+def test_short_series_are_not_downsampled():
+    x = np.arange(10.0)
+    for method in (minmax_downsample, lttb):
+        xs, ys = method(x, x, 100)
+        assert np.array_equal(xs, x)
+
+
+@pytest.mark.parametrize(
+    "model, y0",
+    [
+        (Pendulum(), (1, 0)),
+        (DoublePendulum(), (1, 0, 2, 0)),
+        (NPendulum(3), (1, 0.5, 0, 0, 0, 0)),
+    ],
+)
+def test_plots_stay_within_pixel_budget(model, y0):
+    model.solve(list(y0), 20, 0.001, dense=True)
+    ax = model.plot_energy(n_out=300)
+    assert len(ax.lines) == 3
+    assert all(len(line.get_xdata()) <= 300 for line in ax.lines)
+
+    ax = model.plot_angles(n_out=300, method="lttb")
+    assert len(ax.lines) == len(y0) // 2
+    ax = model.plot_phase()
+    width = ax.get_window_extent().width
+    assert all(len(line.get_xdata()) <= 2 * width + 2 for line in ax.lines)
+    matplotlib.pyplot.close("all")
+
+
+def test_phase_plot_needs_omega():
+    pend = Pendulum()
+    pend.solve([1, 0], 1, 0.01, keep_omega=False)
+    assert len(pend.plot_angles().lines) == 1
+    with pytest.raises(AttributeError):
+        pend.plot_phase()
+    matplotlib.pyplot.close("all")
@@ -0,0 +1,80 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum
+from parameter_sweep import parameter_grid, run_sweep
+from pendulum import DampenedPendulum, Pendulum
+from shared_results import SharedResults, solve_trajectories
+
+
+def test_trajectories_are_written_to_shared_memory():
+    double_pend = DoublePendulum()
+    Y0 = [(0.1, 0, 0.2, 0), (0.5, 0.1, -0.3, 0), (1, 0, 1, 0)]
+    with SharedResults((3, 4, 201)) as serial:
+        t, _ = solve_trajectories(double_pend, Y0, 2, 0.01, serial,
+                                  processes=1)
+        with SharedResults((3, 4, 201)) as parallel:
+            solve_trajectories(double_pend, Y0, 2, 0.01, parallel,
+                               processes=2)
+            assert np.array_equal(serial.array, parallel.array)
+
+        reference = DoublePendulum()
+        reference.solve(list(Y0[2]), 2, 0.01, dense=True)
+        assert np.array_equal(t, reference.t)
+        assert np.array_equal(serial.array[2, 2], reference.theta2)
+
+
+def test_solve_trajectories_creates_block_and_checks_shape():
+    pend = Pendulum()
+    t, results = solve_trajectories(pend, [(0.1, 0), (0.2, 0)], 1, 0.1,
+                                    processes=1, method="verlet")
+    assert results.array.shape == (2, 2, 11)
+    assert np.allclose(results.array[:, 0, 0], [0.1, 0.2])
+    results.close()
+
+    with SharedResults((2, 2, 5)) as wrong:
+        with pytest.raises(ValueError):
+            solve_trajectories(pend, [(0.1, 0), (0.2, 0)], 1, 0.1, wrong)
+
+
+def test_solve_trajectories_follows_storage_policy():
+    double_pend = DoublePendulum()
+    Y0 = [(0.1, 0, 0.2, 0), (0.5, 0.1, -0.3, 0)]
+    t, results = solve_trajectories(double_pend, Y0, 1.2, 0.1, processes=1,
+                                    every=5, keep_omega=False,
+                                    dtype=np.float32)
+    with results:
+        assert results.array.shape == (2, 2, 4)
+        assert results.array.dtype == np.float32
+        double_pend.solve(list(Y0[1]), 1.2, 0.1, dense=True, every=5,
+                          keep_omega=False, dtype=np.float32)
+        assert np.array_equal(t, double_pend.t)
+        assert np.array_equal(results.array[1, 1], double_pend.theta2)
+
+    with pytest.raises(ValueError, match="dense=True"):
+        solve_trajectories(double_pend, Y0, 1.2, 0.1, processes=1,
+                           dense=False)
+
+def test_block_is_removed_on_close_even_with_live_views():
+    results = SharedResults((10,))
+    name = results.name
+    view = results.array[2:5]
+    view[:] = 1
+    results.close()
+    assert results.closed and results.array is None
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    assert np.all(view == 1)
+
+
+def test_run_sweep_writes_into_shared_results():
+    grid = parameter_grid(B=[0.1, 0.2, 0.3], L=[1, 2])
+    expected = run_sweep(DampenedPendulum, grid, [1, 0], 2, 0.01,
+                         processes=1)
+    for processes in (1, 2):
+        with SharedResults((len(grid), 2)) as out:
+            array = run_sweep(DampenedPendulum, grid, [1, 0], 2, 0.01,
+                              processes=processes, out=out)
+            assert array is out.array
+            assert np.array_equal(array, np.array(expected))
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum
+from exp_decay import ExponentialDecay
+from pendulum import (
+    DampenedPendulum, Pendulum, amplitude_below, zero_crossing,
+)
+from solve_cache import SolveCache
+
+
+def test_repeated_solve_hits_memory_tier():
+    cache = SolveCache()
+    y0 = (3*np.pi/7, 1, 3*np.pi/4, 1)
+    first = DoublePendulum()
+    cache.solve(first, y0, 2, 0.01)
+    second = DoublePendulum()
+    cache.solve(second, y0, 2, 0.01)
+
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+    assert np.array_equal(first.theta1, second.theta1)
+    assert np.array_equal(first.x2, second.x2)
+
+def test_key_depends_on_parameters_and_settings():
+    cache = SolveCache()
+    key = cache.key(Pendulum(), (0.5, 0), 10, 0.01)
+    assert key == cache.key(Pendulum(), [0.5, 0.0], 10, 0.01)
+    assert key != cache.key(Pendulum(L=2), (0.5, 0), 10, 0.01)
+    assert key != cache.key(DampenedPendulum(0.1), (0.5, 0), 10, 0.01)
+    assert key != cache.key(Pendulum(), (0.5, 0), 10, 0.01, angle="deg")
+    assert key != cache.key(Pendulum(), (0.5, 0), 10, 0.01, method="Radau")
+
+def test_lru_eviction():
+    cache = SolveCache(maxsize=2)
+    for theta in (0.1, 0.2, 0.3, 0.1):
+        cache.solve(Pendulum(), (theta, 0), 1, 0.1)
+    assert len(cache) == 2
+    assert cache.stats["evictions"] == 2
+    assert cache.stats["misses"] == 4
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    cache = SolveCache(directory=tmp_path)
+    pendulum = Pendulum()
+    cache.solve(pendulum, (30, 0), 2, 0.05, angle="deg")
+
+    reopened = SolveCache(directory=tmp_path)
+    other = Pendulum()
+    reopened.solve(other, (30, 0), 2, 0.05, angle="deg")
+    assert reopened.stats["disk_hits"] == 1
+    assert np.array_equal(other.theta, pendulum.theta)
+    assert np.isclose(other.theta[0], np.pi / 6)
+
+def test_cached_exponential_decay_returns_solution():
+    cache = SolveCache()
+    t, u = cache.solve(ExponentialDecay(0.4), 3, 10, 20)
+    t_hit, u_hit = cache.solve(ExponentialDecay(0.4), 3, 10, 20)
+    assert cache.stats["hits"] == 1
+    assert np.array_equal(u, u_hit)
+
+def test_extend_after_cache_hit_continues_from_cached_solution():
+    cache = SolveCache()
+    pendulum = Pendulum()
+    cache.solve(Pendulum(), (1.0, 0), 2, 0.01)
+    cache.solve(pendulum, (0.1, 0), 2, 0.01)
+    cache.solve(pendulum, (1.0, 0), 2, 0.01)
+    pendulum.extend(3)
+
+    reference = Pendulum()
+    reference.solve((1.0, 0), 3, 0.01)
+    assert np.allclose(pendulum.theta[-1], reference.theta[-1], atol=1e-3)
+
+def test_hit_restores_stats_and_events():
+    def crossing(t, y):
+        return y[0]
+
+    cache = SolveCache()
+    cache.solve(Pendulum(), (0.5, 0), 3, 0.01, events=crossing)
+    first = Pendulum()
+    cache.solve(first, (1.0, 0), 2, 0.01, method="Radau")
+    expected = first.solve_stats
+
+    pendulum = Pendulum()
+    cache.solve(pendulum, (0.5, 0), 3, 0.01, events=crossing)
+    t_events = pendulum.t_events
+    cache.solve(pendulum, (1.0, 0), 2, 0.01, method="Radau")
+    assert cache.stats["hits"] == 2
+    assert pendulum.solve_stats is expected
+    assert pendulum.nfev == expected["nfev"]
+    assert not hasattr(pendulum, "t_events")
+
+    cache.solve(pendulum, (0.5, 0), 3, 0.01, events=crossing)
+    assert np.array_equal(pendulum.t_events[0], t_events[0])
+    assert len(t_events[0]) == 3
+
+def test_key_describes_events_instead_of_their_address():
+    cache = SolveCache()
+    pendulum = Pendulum()
+    counts = []
+    for direction in (1, -1, 1):
+        cache.solve(pendulum, (0.5, 0), 3, 0.01,
+                    events=zero_crossing(direction=direction))
+        counts.append(len(pendulum.t_events[0]))
+    assert cache.stats["misses"] == 2 and cache.stats["hits"] == 1
+    assert counts == [1, 2, 1]
+
+    key = cache.key(pendulum, (0.5, 0), 3, 0.01, events=zero_crossing(1))
+    assert key == cache.key(pendulum, (0.5, 0), 3, 0.01,
+                            events=zero_crossing(1))
+    assert key != cache.key(pendulum, (0.5, 0), 3, 0.01,
+                            events=zero_crossing(1, terminal=True))
+    assert key != cache.key(pendulum, (0.5, 0), 3, 0.01,
+                            events=amplitude_below(pendulum, 0.1))
+    with pytest.raises(TypeError):
+        cache.key(pendulum, (0.5, 0), 3, 0.01, events=object())
+
+def test_key_normalises_dtype():
+    cache = SolveCache()
+    assert (cache.key(Pendulum(), (0.5, 0), 1, 0.1, dtype=np.float32)
+            == cache.key(Pendulum(), (0.5, 0), 1, 0.1, dtype="float32"))
+
+def test_disk_hit_keeps_storage_dtype(tmp_path):
+    SolveCache(directory=tmp_path).solve(Pendulum(), (0.5, 0), 2, 0.01,
+                                         dtype=np.float32)
+    pendulum = Pendulum()
+    reopened = SolveCache(directory=tmp_path)
+    reopened.solve(pendulum, (0.5, 0), 2, 0.01, dtype="float32")
+    assert reopened.stats["disk_hits"] == 1
+    assert pendulum.theta.dtype == np.float32
+    assert pendulum.t.dtype == np.float64
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from double_pendulum import DoublePendulum
+from exp_decay import ExponentialDecay
+from pendulum import Pendulum, DampenedPendulum
+from trajectory_store import load_trajectory, read_header, save_trajectory
+
+
+@pytest.mark.parametrize(
+    "model, y0",
+    [
+        (Pendulum(L=2), (np.pi/6, 0.15)),
+        (DampenedPendulum(0.25, M=2), (np.pi/6, 0)),
+        (DoublePendulum(L2=0.5), (np.pi/6, 0.15, np.pi/3, 0.15)),
+    ],
+)
+def test_saved_pendulum_reopens_with_same_properties(tmp_path, model, y0):
+    model.solve(list(y0), 5, 0.05)
+    path = tmp_path / "run.traj"
+    save_trajectory(model, path)
+
+    loaded = load_trajectory(path)
+    assert type(loaded) is type(model)
+    assert loaded._parameters() == model._parameters()
+    assert loaded._solve_info == model._solve_info
+    for name in model._columns:
+        assert np.array_equal(getattr(loaded, name), getattr(model, name))
+    assert np.allclose(loaded.kinetic, model.kinetic)
+    assert np.allclose(loaded.potential, model.potential)
+
+def test_saved_exponential_decay_reopens(tmp_path):
+    model = ExponentialDecay(0.4)
+    t, u = model.solve(3, 10, 20)
+    path = tmp_path / "decay.traj"
+    save_trajectory(model, path, dtype=np.float32)
+
+    header, offset = read_header(path)
+    assert header["shape"] == [2, 20]
+    assert header["solve"]["T"] == 10
+    assert offset % 64 == 0
+
+    loaded = load_trajectory(path)
+    assert loaded.a == 0.4
+    assert loaded.u.dtype == np.float32
+    assert np.allclose(loaded.u, u)
+
+def test_save_uses_storage_dtype(tmp_path):
+    model = DoublePendulum()
+    model.solve([np.pi/6, 0, np.pi/3, 0], 5, 0.01, dense=True,
+                dtype=np.float32, keep_omega=False)
+    path = tmp_path / "compact.traj"
+    save_trajectory(model, path)
+
+    n = len(model.t)
+    assert path.stat().st_size - read_header(path)[1] == n * (8 + 2 * 4)
+    loaded = load_trajectory(path)
+    assert loaded.t.dtype == np.float64
+    assert loaded.theta2.dtype == np.float32
+    assert np.array_equal(loaded.t, model.t)
+    assert np.array_equal(loaded.theta2, model.theta2)
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a trajectory")
+    with pytest.raises(ValueError):
+        load_trajectory(path)
@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+from double_pendulum import DoublePendulum
+from exp_decay import ExponentialDecay
+from n_pendulum import NPendulum
+from pendulum import Pendulum, DampenedPendulum
+from solver_tools import stored_columns
+
+# Filformat:
+#   8 byte   MAGIC
+#   8 byte   lengden H av headeren (little-endian uint64)
+#   H byte   JSON-header med modell, parametere, innstillingene fra solve,
+#            kolonnenavn, dtype, t_dtype og form (kolonner, punkter). Fylles
+#            ut med mellomrom slik at dataene starter på en grense delelig
+#            med ALIGNMENT.
+#   data     t som (punkter,) array med t_dtype, og rett etter tilstandene
+#            som én sammenhengende (kolonner - 1, punkter) array i
+#            C-rekkefølge med dtype, i rekkefølgen i modellens _columns.
+#            Filer uten t_dtype har t og tilstandene i én (kolonner, punkter)
+#            array med dtype.
+MAGIC = b"PENDTRJ1"
+ALIGNMENT = 64
+
+MODELS = {
+    cls.__name__: cls
+    for cls in (Pendulum, DampenedPendulum, DoublePendulum, ExponentialDecay,
+                NPendulum)
+}
+
+
+def save_trajectory(model, path, dtype=None):
+    """
+    Lagrer løsningen til en løst modell i en binær fil, sammen med
+    parameterne til modellen og innstillingene som ble brukt i solve.
+    Tilstandene lagres som standard med dtype fra lagringsreglene i solve
+    (float64 uten), og t alltid som float64, som i storage_policy.
+    """
+    arrays = model._solution_arrays()
+    info = getattr(model, "_solve_info", None)
+    if dtype is None:
+        policy = (info or {}).get("storage")
+        dtype = policy["dtype"] if policy is not None else np.float64
+    dtype = np.dtype(dtype)
+    header = {
+        "model": type(model).__name__,
+        "parameters": model._parameters(),
+        "solve": info,
+        "columns": stored_columns(model),
+        "dtype": dtype.str,
+        "t_dtype": np.dtype(np.float64).str,
+        "shape": [len(arrays), len(arrays[0])],
+    }
+    encoded = json.dumps(header).encode()
+    offset = len(MAGIC) + 8 + len(encoded)
+    encoded += b" " * (-offset % ALIGNMENT)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(encoded).to_bytes(8, "little"))
+        f.write(encoded)
+        f.write(np.ascontiguousarray(arrays[0], dtype=np.float64).tobytes())
+        for array in arrays[1:]:
+            f.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+
+def read_header(path):
+    """
+    Leser headeren til en lagret løsning, og returnerer den som en dict
+    sammen med posisjonen der dataene starter.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a trajectory file")
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length))
+    return header, len(MAGIC) + 8 + length
+
+
+def load_trajectory(path, mode="r"):
+    """
+    Åpner en lagret løsning og returnerer en ny modell av samme klasse med
+    de samme parameterne. Løsningen memory-mappes i stedet for å leses inn,
+    så filen åpnes umiddelbart og bare delene som faktisk brukes leses fra
+    disk. Egenskapene t, theta, omega og energiene virker som etter solve.
+    """
+    header, offset = read_header(path)
+    model = MODELS[header["model"]](**header["parameters"])
+    columns, n = header["shape"]
+    if "t_dtype" in header:
+        t = np.asarray(np.memmap(path, dtype=header["t_dtype"], mode=mode,
+                                 offset=offset, shape=(n,)))
+        y = np.asarray(np.memmap(path, dtype=header["dtype"], mode=mode,
+                                 offset=offset + t.nbytes,
+                                 shape=(columns - 1, n)))
+    else:
+        data = np.asarray(np.memmap(path, dtype=header["dtype"], mode=mode,
+                                    offset=offset, shape=(columns, n)))
+        t, y = data[0], data[1:]
+    model._set_solution(t, y)
+    model._solve_info = header["solve"]
+    return model